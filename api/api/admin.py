@@ -6,6 +6,9 @@ from .models import (
     Sensor,
     Car,
     TrafficObservation,
+    IngestBatch,
+    SpeedRollup,
+    TrafficVolume,
 )
 
 admin.site.register(RoadSegment)
@@ -14,3 +17,6 @@ admin.site.register(TrafficIntensityThreshold)
 admin.site.register(Sensor)
 admin.site.register(Car)
 admin.site.register(TrafficObservation)
+admin.site.register(IngestBatch)
+admin.site.register(SpeedRollup)
+admin.site.register(TrafficVolume)
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class APIConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        # Connect signal receivers
+        from . import (  # noqa: F401
+            cars,
+            events,
+            lookups,
+            response_cache,
+            sensor_keys,
+            versions,
+        )
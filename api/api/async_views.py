@@ -0,0 +1,146 @@
+import asyncio
+import json
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+from .events import RESYNC, Subscription, broker
+from .models import Car, RoadSegment, TrafficIntensityThreshold
+from .payloads import (
+    car_observations,
+    car_observations_payload,
+    road_segment_payload,
+    threshold_payload,
+)
+
+# Native async versions of the read endpoints, for ASGI deployments. Each
+# request waits on the database without holding a worker thread.
+
+KEEPALIVE_INTERVAL = 15
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+async def road_segment_list(request):
+    """
+    Road segments by ascending id, ``?after=<id>&page_size=`` to page through
+    them and ``?intensity=`` to filter like the sync endpoint.
+    """
+    queryset = RoadSegment.objects.defer("geom").order_by("id")
+
+    intensity = request.GET.get("intensity", "").lower()
+    if intensity in ["high", "medium", "low"]:
+        threshold = await sync_to_async(TrafficIntensityThreshold.current)()
+        queryset = queryset.filter_intensity(intensity, threshold)
+
+    try:
+        after = int(request.GET.get("after", 0))
+        page_size = min(int(request.GET.get("page_size", 100)), 1000)
+    except ValueError:
+        return json_response({"error": "Invalid pagination"}, status=400)
+
+    results = [
+        road_segment_payload(segment)
+        async for segment in queryset.filter(id__gt=after)[:page_size]
+    ]
+    return json_response(
+        {
+            "next": results[-1]["id"] if len(results) == page_size else None,
+            "results": results,
+        }
+    )
+
+
+async def road_segment_detail(request, pk):
+    try:
+        segment = await RoadSegment.objects.defer("geom").aget(pk=pk)
+    except RoadSegment.DoesNotExist:
+        return json_response({"detail": "No RoadSegment matches the given query."}, 404)
+    return json_response(road_segment_payload(segment))
+
+
+async def threshold_current(request):
+    threshold = await sync_to_async(TrafficIntensityThreshold.current)()
+    return json_response(threshold_payload(threshold))
+
+
+async def car_last_24h_observations(request):
+    license_plate = request.GET.get("license_plate")
+    if not license_plate:
+        return json_response({"error": "License plate is required"}, status=400)
+
+    cache_key = f"car-last-24h-observations:{license_plate}"
+    result = await cache.aget(cache_key)
+    if result is not None:
+        return json_response(result)
+
+    try:
+        car = await Car.objects.aget(license_plate=license_plate)
+    except Car.DoesNotExist:
+        return json_response({"error": "Car not found"}, status=404)
+
+    start_time = timezone.now() - timedelta(hours=24)
+    observations = [row async for row in car_observations(car, start_time)]
+    result = car_observations_payload(car, observations)
+    await cache.aset(cache_key, result, settings.CAR_OBSERVATIONS_CACHE_TIMEOUT)
+    return json_response(result)
+
+
+async def road_segment_events(request):
+    """
+    Server-Sent Events stream of segment speed and intensity changes, for
+    the segments in ``?segments=1,2,3`` and/or inside ``?bbox=``.
+    """
+    # A stream holds its worker for as long as the client stays connected
+    if not isinstance(request, ASGIRequest):
+        return json_response(
+            {"error": "Events are only served by the ASGI server"}, status=501
+        )
+
+    segment_ids = bbox = None
+    try:
+        if "segments" in request.GET:
+            segment_ids = {int(pk) for pk in request.GET["segments"].split(",")}
+        if "bbox" in request.GET:
+            bbox = [float(value) for value in request.GET["bbox"].split(",")]
+    except ValueError:
+        return json_response({"error": "Invalid segments or bbox"}, status=400)
+    if bbox is not None and len(bbox) != 4:
+        return json_response(
+            {"error": "bbox expects min_lon,min_lat,max_lon,max_lat"}, status=400
+        )
+
+    subscription = Subscription(segment_ids, bbox)
+
+    async def stream():
+        broker.subscribe(subscription)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), KEEPALIVE_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                if event is RESYNC:
+                    # Events were dropped, the client reloads the segments
+                    yield "event: resync\ndata: {}\n\n"
+                    continue
+                event = {key: value for key, value in event.items() if key != "bbox"}
+                yield f"event: segment\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Car
+
+CARS_VERSION_KEY = "cars-version"
+
+# Inserts the unseen plates and returns the id of every plate. Rows another
+# transaction inserted after this statement's snapshot are fetched afterwards.
+UPSERT_SQL = """
+WITH input (license_plate) AS (VALUES {values}),
+inserted AS (
+    INSERT INTO {table} (license_plate, created_at)
+    SELECT license_plate, now() FROM input
+    ON CONFLICT (license_plate) DO NOTHING
+    RETURNING license_plate, id
+)
+SELECT license_plate, id FROM inserted
+UNION ALL
+SELECT c.license_plate, c.id FROM {table} c JOIN input USING (license_plate)
+"""
+
+
+def cars_version():
+    # Seeded from the clock so an evicted version is never reused
+    return cache.get_or_set(CARS_VERSION_KEY, time.time_ns, None)
+
+
+class PlateCache:
+    """
+    Process-local LRU of license plate to car id. Entries are tagged with the
+    shared cars version, which car deletions bump.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, plates, version):
+        found = {}
+        with self.lock:
+            for plate in plates:
+                entry = self.entries.get(plate)
+                if entry is not None and entry[1] == version:
+                    self.entries.move_to_end(plate)
+                    found[plate] = entry[0]
+            self.hits += len(found)
+            self.misses += len(plates) - len(found)
+        return found
+
+    def set_many(self, car_ids, version):
+        with self.lock:
+            for plate, car_id in car_ids.items():
+                self.entries[plate] = (car_id, version)
+                self.entries.move_to_end(plate)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else None,
+        }
+
+
+plate_cache = PlateCache(settings.CAR_PLATE_CACHE_SIZE)
+
+
+def upsert_cars(plates, chunk_size=1000):
+    # Car id of every plate, inserting the unseen ones
+    plates = list(plates)
+    table = connection.ops.quote_name(Car._meta.db_table)
+    car_ids = {}
+    with connection.cursor() as cursor:
+        for i in range(0, len(plates), chunk_size):
+            chunk = plates[i : i + chunk_size]
+            values = ", ".join(["(%s)"] * len(chunk))
+            cursor.execute(UPSERT_SQL.format(values=values, table=table), chunk)
+            car_ids.update(cursor.fetchall())
+
+    missing = set(plates) - car_ids.keys()
+    if missing:  # Inserted concurrently, committed since the statement began
+        car_ids.update(
+            Car.objects.filter(license_plate__in=missing).values_list(
+                "license_plate", "pk"
+            )
+        )
+    return car_ids
+
+
+def car_ids(plates):
+    """
+    Car id of every license plate in ``plates``. Known plates come from the
+    process cache, the others are inserted or fetched in one statement.
+    """
+    plates = set(plates)
+    version = cars_version()
+    found = plate_cache.get_many(plates, version)
+
+    missing = plates - found.keys()
+    if missing:
+        fetched = upsert_cars(missing)
+        found.update(fetched)
+        # Cached once committed, a rolled back insert must not be remembered
+        transaction.on_commit(lambda: plate_cache.set_many(fetched, version))
+    return found
+
+
+def invalidate_cars():
+    plate_cache.clear()
+    cache.set(CARS_VERSION_KEY, time.time_ns(), None)
+
+
+@receiver(post_delete, sender=Car)
+def car_deleted_plates(sender, **kwargs):
+    invalidate_cars()
+    transaction.on_commit(invalidate_cars)
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import select
+import threading
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField, Func
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.dispatch import receiver
+from .models import RoadSegment
+from .signals import readings_changed
+
+CHANNEL = "traffic_events"
+LISTENER_NAME = "traffic_events_listener"  # application_name of listeners
+EVENTS_PER_NOTIFY = 50  # Keeps each NOTIFY payload under the 8000 byte limit
+RESYNC = object()  # Queued in place of the events a slow client missed
+
+
+class PointX(Func):
+    function = "ST_X"
+    output_field = FloatField()
+
+
+class PointY(Func):
+    function = "ST_Y"
+    output_field = FloatField()
+
+
+def listening():
+    # Whether a broker listens, by the application name its connection sets
+    return RawSQL(
+        "EXISTS (SELECT 1 FROM pg_stat_activity WHERE application_name = %s)",
+        [LISTENER_NAME],
+        output_field=BooleanField(),
+    )
+
+
+@receiver(readings_changed)
+def readings_changed_events(sender, segment_ids, **kwargs):
+    transaction.on_commit(lambda: publish(segment_ids))
+
+
+def publish(segment_ids):
+    """
+    Broadcast the new state of the segments to every process through
+    Postgres NOTIFY. Listeners drop the events that change nothing. Without
+    a listening process the query reads no rows and nothing is sent.
+    """
+    events = [
+        {
+            "id": segment_id,
+            "current_speed": current_speed,
+            "traffic_intensity": traffic_intensity,
+            "updated_at": updated_at.isoformat(),
+            "bbox": bbox,
+        }
+        for segment_id, current_speed, traffic_intensity, updated_at, *bbox in (
+            RoadSegment.objects.filter(pk__in=segment_ids)
+            .filter(listening())
+            .values_list(
+                "id",
+                "latest_speed",
+                "intensity",
+                Coalesce("latest_reading_at", "created_at"),
+                Least(PointX("start_point"), PointX("end_point")),
+                Least(PointY("start_point"), PointY("end_point")),
+                Greatest(PointX("start_point"), PointX("end_point")),
+                Greatest(PointY("start_point"), PointY("end_point")),
+            )
+        )
+    ]
+    if not events:
+        return
+    with connection.cursor() as cursor:
+        for i in range(0, len(events), EVENTS_PER_NOTIFY):
+            payload = json.dumps(events[i : i + EVENTS_PER_NOTIFY])
+            cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, payload])
+
+
+class Subscription:
+    def __init__(self, segment_ids=None, bbox=None):
+        self.segment_ids = segment_ids
+        self.bbox = bbox
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=1000)
+
+    def matches(self, event):
+        if self.segment_ids is not None and event["id"] not in self.segment_ids:
+            return False
+        if self.bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = event["bbox"]
+            return (
+                min_lon <= self.bbox[2]
+                and max_lon >= self.bbox[0]
+                and min_lat <= self.bbox[3]
+                and max_lat >= self.bbox[1]
+            )
+        return True
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client. The broker already recorded the change, so instead
+            # of losing it the backlog is replaced by a single resync
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class Broker:
+    """
+    Fans out segment events received on the Postgres channel to the
+    subscribed clients of this process, from one listener thread.
+    """
+
+    def __init__(self):
+        self.subscriptions = set()
+        self.last_state = {}
+        self.lock = threading.Lock()
+        self.listener = None
+
+    def subscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.add(subscription)
+            if self.listener is None or not self.listener.is_alive():
+                self.listener = threading.Thread(target=self.listen, daemon=True)
+                self.listener.start()
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def dispatch(self, events):
+        for event in events:
+            state = (event["current_speed"], event["traffic_intensity"])
+            if self.last_state.get(event["id"]) == state:
+                continue
+            self.last_state[event["id"]] = state
+
+            with self.lock:
+                subscriptions = list(self.subscriptions)
+            for subscription in subscriptions:
+                if subscription.matches(event):
+                    subscription.loop.call_soon_threadsafe(subscription.put, event)
+
+    def listen(self):
+        params = connection.get_connection_params()
+        listener = connection.get_new_connection(params)
+        listener.autocommit = True
+        try:
+            with listener.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+                cursor.execute(
+                    "SELECT set_config('application_name', %s, false)", [LISTENER_NAME]
+                )
+            while True:
+                if select.select([listener], [], [], 5) == ([], [], []):
+                    continue
+                listener.poll()
+                while listener.notifies:
+                    notify = listener.notifies.pop(0)
+                    self.dispatch(json.loads(notify.payload))
+        finally:
+            listener.close()
+
+
+broker = Broker()
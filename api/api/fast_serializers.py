@@ -0,0 +1,98 @@
+from django.db.models import CharField, Func
+from rest_framework import serializers
+
+# Formats datetimes exactly like the serializer fields, without binding them
+datetime_field = serializers.DateTimeField()
+
+
+class PointEWKT(Func):
+    # Same text as str(GEOSGeometry), e.g. "SRID=4326;POINT (1 2)", built in SQL
+    template = (
+        "'SRID=' || ST_SRID(%(expressions)s) || ';POINT (' || "
+        "ST_X(%(expressions)s) || ' ' || ST_Y(%(expressions)s) || ')'"
+    )
+    output_field = CharField()
+
+
+def format_datetime(value):
+    return datetime_field.to_representation(value) if value else None
+
+
+class RoadSegmentFastSerializer:
+    """
+    Read-only equivalent of RoadSegmentSerializer for lists, built from
+    ``.values()`` rows with the points already formatted by the database.
+    """
+
+    def values(self, queryset):
+        return queryset.annotate(
+            start_ewkt=PointEWKT("start_point"), end_ewkt=PointEWKT("end_point")
+        ).values(
+            "id",
+            "latest_speed",
+            "intensity",
+            "readings_count",
+            "latest_reading_at",
+            "start_ewkt",
+            "end_ewkt",
+            "length",
+            "created_at",
+        )
+
+    def serialize(self, rows):
+        return [
+            {
+                "id": row["id"],
+                "current_speed": row["latest_speed"],
+                "traffic_intensity": row["intensity"],
+                "readings_count": row["readings_count"],
+                "updated_at": format_datetime(
+                    row["latest_reading_at"] or row["created_at"]
+                ),
+                "start_point": row["start_ewkt"],
+                "end_point": row["end_ewkt"],
+                "length": row["length"],
+                "created_at": format_datetime(row["created_at"]),
+            }
+            for row in rows
+        ]
+
+
+class TrafficObservationFastSerializer:
+    """
+    Read-only equivalent of TrafficObservationSerializer for lists, with the
+    car and sensor read in the same ``.values()`` query.
+    """
+
+    def values(self, queryset):
+        return queryset.values(
+            "id",
+            "road_segment_id",
+            "timestamp",
+            "created_at",
+            "car__license_plate",
+            "car__created_at",
+            "sensor_id",
+            "sensor__uuid",
+            "sensor__name",
+        )
+
+    def serialize(self, rows):
+        return [
+            {
+                "id": row["id"],
+                "road_segment": row["road_segment_id"],
+                "timestamp": format_datetime(row["timestamp"]),
+                "created_at": format_datetime(row["created_at"]),
+                "car": {
+                    "license_plate": row["car__license_plate"],
+                    "created_at": row["car__created_at"],
+                },
+                "sensor": {
+                    "id": row["sensor_id"],
+                    "uuid": str(row["sensor__uuid"]),
+                    "name": row["sensor__name"],
+                },
+            }
+            for row in rows
+        ]
@@ -0,0 +1,40 @@
+import hashlib
+import math
+
+PRECISION = 10
+REGISTERS = 1 << PRECISION  # 1 KB per sketch, ~3% standard error
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch of distinct values. Registers are stored as bytes and
+    two sketches merge by keeping the larger register.
+    """
+
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers or REGISTERS)
+
+    def add(self, value):
+        hashed = int.from_bytes(
+            hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big"
+        )
+        index = hashed >> (64 - PRECISION)
+        rest = hashed & ((1 << (64 - PRECISION)) - 1)
+        rank = (64 - PRECISION) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / REGISTERS)
+        estimate = alpha * REGISTERS**2 / sum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * REGISTERS and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = REGISTERS * math.log(REGISTERS / zeros)
+        return round(estimate)
+
+    def to_bytes(self):
+        return bytes(self.registers)
@@ -0,0 +1,68 @@
+import csv
+from itertools import islice
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from .models import RoadSegment, SpeedReading
+
+
+def parse_road_segment(row):
+    id, start_lon, start_lat, end_lon, end_lat, length, speed = row[:7]
+
+    segment = RoadSegment(
+        start_point=Point(float(start_lon), float(start_lat)),
+        end_point=Point(float(end_lon), float(end_lat)),
+        length=float(length),
+    )
+    segment.refresh_geom()  # bulk_create does not call save()
+    return segment, float(speed)
+
+
+def import_road_segments(lines, strict=True, chunk_size=5000):
+    """
+    Stream a road segment CSV (id, start lon/lat, end lon/lat, length, speed)
+    and load the segments with their initial speed reading in batches.
+
+    Everything runs in one transaction. Rows that cannot be parsed are
+    reported as ``{"line": n, "error": "..."}``; with ``strict`` any error
+    rolls the whole import back, otherwise the bad rows are skipped.
+    Returns ``(created_segment_ids, errors)``.
+    """
+    reader = csv.reader(lines)
+    next(reader, None)  # Skip header row
+
+    created, errors = [], []
+    with transaction.atomic():
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                break
+
+            segments, speeds = [], []
+            # Line numbers of the chunk rows, as the reader has moved past them
+            first_line = reader.line_num - len(chunk) + 1
+            for line, row in enumerate(chunk, start=first_line):
+                try:
+                    segment, speed = parse_road_segment(row)
+                except Exception as e:
+                    errors.append({"line": line, "error": str(e)})
+                    continue
+                segments.append(segment)
+                speeds.append(speed)
+
+            if strict and errors:
+                continue  # Keep validating, nothing will be stored
+
+            RoadSegment.objects.bulk_create(segments)
+            SpeedReading.objects.bulk_create(
+                [
+                    SpeedReading(road_segment=segment, speed=speed)
+                    for segment, speed in zip(segments, speeds)
+                ]
+            )
+            created.extend(segment.id for segment in segments)
+
+        if strict and errors:
+            transaction.set_rollback(True)
+            return [], errors
+
+    return created, errors
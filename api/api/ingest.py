@@ -0,0 +1,250 @@
+import math
+import uuid
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .cars import car_ids, invalidate_cars
+from .lookups import ingest_lookups, invalidate_lookups
+from .models import SpeedReading, TrafficObservation
+
+
+def parse_timestamp(value):
+    # Aware datetime, or None when the value is not a datetime
+    try:
+        timestamp = parse_datetime(str(value))
+    except ValueError:
+        return None
+    if timestamp is not None and timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    return timestamp
+
+
+def parse_pk(value):
+    # Integers or their string form (CSV), never truncated floats or booleans
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise TypeError(value)
+    return int(value)
+
+
+def parse_observation(row):
+    """
+    Cheap field-level validation of one observation, without touching the
+    database. Returns ``(data, errors)`` where exactly one is set.
+    """
+    if not isinstance(row, dict):
+        return None, {"non_field_errors": ["Invalid data. Expected a dictionary."]}
+
+    data, errors = {}, {}
+
+    try:
+        data["road_segment"] = parse_pk(row["road_segment"])
+    except KeyError:
+        errors["road_segment"] = ["This field is required."]
+    except (TypeError, ValueError):
+        errors["road_segment"] = ["Incorrect type. Expected pk value."]
+
+    license_plate = row.get("license_plate")
+    if not isinstance(license_plate, str) or not license_plate.strip():
+        errors["license_plate"] = ["This field is required."]
+    elif len(license_plate.strip()) > 20:
+        errors["license_plate"] = ["Ensure this field has no more than 20 characters."]
+    else:
+        data["license_plate"] = license_plate.strip()
+
+    try:
+        data["sensor_uuid"] = uuid.UUID(str(row["sensor_uuid"]))
+    except KeyError:
+        errors["sensor_uuid"] = ["This field is required."]
+    except ValueError:
+        errors["sensor_uuid"] = ["Must be a valid UUID."]
+
+    if "timestamp" not in row:
+        errors["timestamp"] = ["This field is required."]
+    else:
+        data["timestamp"] = parse_timestamp(row["timestamp"])
+        if data["timestamp"] is None:
+            errors["timestamp"] = ["Datetime has wrong format."]
+
+    if errors:
+        return None, errors
+    return data, None
+
+
+def ingest_observations(rows, batch_size=5000, sensor_uuid=None):
+    """
+    Validate and insert a batch of traffic observations.
+
+    Foreign keys are checked against the in-process lookups and cars come
+    from the plate cache, unseen ones inserted in one statement. Valid rows
+    are stored in a single transaction and rejected rows are reported as
+    ``{"index": i, "errors": {...}}``. With ``sensor_uuid`` only
+    observations of that sensor are accepted. Returns
+    ``(created_count, rejected)``.
+    """
+    parsed, rejected = [], []
+    for index, row in enumerate(rows):
+        data, errors = parse_observation(row)
+        if errors:
+            rejected.append({"index": index, "errors": errors})
+        else:
+            parsed.append((index, data))
+
+    def insert():
+        accepted, missing = check_observations(parsed, sensor_uuid)
+        if accepted:
+            plate_ids = car_ids(data["license_plate"] for data in accepted)
+            TrafficObservation.objects.bulk_create(
+                [
+                    TrafficObservation(
+                        road_segment_id=data["road_segment"],
+                        car_id=plate_ids[data["license_plate"]],
+                        sensor_id=data["sensor_id"],
+                        timestamp=data["timestamp"],
+                    )
+                    for data in accepted
+                ],
+                batch_size=batch_size,
+            )
+        return accepted, missing
+
+    accepted, missing = insert_checked(insert)
+    rejected = sorted(rejected + missing, key=lambda item: item["index"])
+    return len(accepted), rejected
+
+
+def check_observations(parsed, sensor_uuid=None):
+    # Split parsed observations into accepted rows and rejected references
+    segment_ids = ingest_lookups.segments(data["road_segment"] for _, data in parsed)
+    sensor_ids = ingest_lookups.sensors(data["sensor_uuid"] for _, data in parsed)
+
+    accepted, rejected = [], []
+    for index, data in parsed:
+        errors = {}
+        if data["road_segment"] not in segment_ids:
+            errors["road_segment"] = [
+                f'Invalid pk "{data["road_segment"]}" - object does not exist.'
+            ]
+        if data["sensor_uuid"] not in sensor_ids:
+            errors["sensor_uuid"] = [
+                f"Object with uuid={data['sensor_uuid']} does not exist."
+            ]
+        elif sensor_uuid is not None and data["sensor_uuid"] != sensor_uuid:
+            errors["sensor_uuid"] = ["Does not match the sensor of the API key."]
+        if errors:
+            rejected.append({"index": index, "errors": errors})
+        else:
+            accepted.append(dict(data, sensor_id=sensor_ids[data["sensor_uuid"]]))
+    return accepted, rejected
+
+
+def insert_checked(insert):
+    """
+    Run ``insert`` in a transaction and check its deferred foreign keys
+    before leaving it, rather than at the outer commit. A violation means the
+    process lookups or plate cache were stale, e.g. a segment or car deleted
+    by another process: both are dropped and ``insert`` validates, resolves
+    the plates and runs once more.
+    """
+    try:
+        with transaction.atomic():
+            result = insert()
+            connection.check_constraints()
+        return result
+    except IntegrityError:
+        invalidate_lookups()
+        invalidate_cars()
+    with transaction.atomic():
+        result = insert()
+        connection.check_constraints()
+    return result
+
+
+def parse_speed_reading(row):
+    """
+    Cheap field-level validation of one speed reading, without touching the
+    database. ``created_at`` is optional. Returns ``(data, errors)``.
+    """
+    if not isinstance(row, dict):
+        return None, {"non_field_errors": ["Invalid data. Expected a dictionary."]}
+
+    data, errors = {}, {}
+
+    try:
+        data["road_segment"] = parse_pk(row["road_segment"])
+    except KeyError:
+        errors["road_segment"] = ["This field is required."]
+    except (TypeError, ValueError):
+        errors["road_segment"] = ["Incorrect type. Expected pk value."]
+
+    try:
+        data["speed"] = float(row["speed"])
+    except KeyError:
+        errors["speed"] = ["This field is required."]
+    except (TypeError, ValueError):
+        errors["speed"] = ["A valid number is required."]
+    if "speed" in data and not math.isfinite(data["speed"]):
+        errors["speed"] = ["A valid number is required."]
+
+    if row.get("created_at") not in (None, ""):
+        data["created_at"] = parse_timestamp(row["created_at"])
+        if data["created_at"] is None:
+            errors["created_at"] = ["Datetime has wrong format."]
+
+    if errors:
+        return None, errors
+    return data, None
+
+
+def ingest_speed_readings(rows, batch_size=5000):
+    """
+    Validate and insert a batch of speed readings.
+
+    Segments are checked against the in-process lookups and the readings are
+    inserted with one ``bulk_create``, so the latest reading state and rollups
+    are refreshed once for the whole batch. Returns ``(created_count, rejected)``.
+    """
+    parsed, rejected = [], []
+    for index, row in enumerate(rows):
+        data, errors = parse_speed_reading(row)
+        if errors:
+            rejected.append({"index": index, "errors": errors})
+        else:
+            parsed.append((index, data))
+
+    def insert():
+        segment_ids = ingest_lookups.segments(
+            data["road_segment"] for _, data in parsed
+        )
+        accepted, missing = [], []
+        for index, data in parsed:
+            if data["road_segment"] in segment_ids:
+                accepted.append(data)
+                continue
+            missing.append(
+                {
+                    "index": index,
+                    "errors": {
+                        "road_segment": [
+                            f'Invalid pk "{data["road_segment"]}" - object does not exist.'
+                        ]
+                    },
+                }
+            )
+        if accepted:
+            SpeedReading.objects.bulk_create(
+                [
+                    SpeedReading(
+                        road_segment_id=data["road_segment"],
+                        speed=data["speed"],
+                        # Stamped one by one, not the whole batch at once
+                        created_at=data.get("created_at") or timezone.now(),
+                    )
+                    for data in accepted
+                ],
+                batch_size=batch_size,
+            )
+        return accepted, missing
+
+    accepted, missing = insert_checked(insert)
+    rejected = sorted(rejected + missing, key=lambda item: item["index"])
+    return len(accepted), rejected
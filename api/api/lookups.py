@@ -0,0 +1,92 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import RoadSegment, Sensor
+
+LOOKUPS_VERSION_KEY = "ingest-lookups-version"
+
+
+def lookups_version():
+    # Seeded from the clock so an evicted version is never reused
+    return cache.get_or_set(LOOKUPS_VERSION_KEY, time.time_ns, None)
+
+
+class IngestLookups:
+    """
+    Process-local copy of every road segment id and of sensor ids by uuid,
+    for validating ingested rows without a query. Reloaded when the shared
+    version changes, at least every ``max_age`` seconds, and when a lookup
+    misses something that exists (e.g. segments added by bulk import).
+    """
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self.version = None
+        self.expires_at = 0
+        self.data = (frozenset(), {})
+        self.lock = threading.Lock()
+
+    def snapshot(self):
+        version = lookups_version()
+        if version != self.version or time.monotonic() >= self.expires_at:
+            with self.lock:
+                if version != self.version or time.monotonic() >= self.expires_at:
+                    self.data = (
+                        frozenset(RoadSegment.objects.values_list("pk", flat=True)),
+                        dict(Sensor.objects.values_list("uuid", "pk")),
+                    )
+                    self.version = version
+                    self.expires_at = time.monotonic() + self.max_age
+        return self.data
+
+    def reset(self):
+        self.version = None
+
+    def segments(self, ids):
+        """
+        The subset of ``ids`` that are road segments.
+        """
+        ids = set(ids)
+        segment_ids, _ = self.snapshot()
+        missing = ids - segment_ids
+        if missing and RoadSegment.objects.filter(pk__in=missing).exists():
+            self.reset()
+            segment_ids, _ = self.snapshot()
+        return ids & segment_ids
+
+    def sensors(self, uuids):
+        """
+        Sensor id of every uuid in ``uuids`` that is a sensor.
+        """
+        uuids = set(uuids)
+        _, sensor_ids = self.snapshot()
+        missing = uuids - sensor_ids.keys()
+        if missing and Sensor.objects.filter(uuid__in=missing).exists():
+            self.reset()
+            _, sensor_ids = self.snapshot()
+        return {uuid: sensor_ids[uuid] for uuid in uuids if uuid in sensor_ids}
+
+
+ingest_lookups = IngestLookups(settings.INGEST_LOOKUPS_MAX_AGE)
+
+
+def invalidate_lookups():
+    ingest_lookups.reset()
+    cache.set(LOOKUPS_VERSION_KEY, time.time_ns(), None)
+
+
+@receiver(post_save, sender=RoadSegment)
+@receiver(post_delete, sender=RoadSegment)
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+def lookups_changed(sender, created=True, **kwargs):
+    # Updates keep the ids and uuids
+    if not created:
+        return
+    # Again on commit, in case another request reloaded the old rows meanwhile
+    invalidate_lookups()
+    transaction.on_commit(invalidate_lookups)
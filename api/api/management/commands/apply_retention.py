@@ -0,0 +1,143 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from api.hll import HyperLogLog
+from api.models import SpeedReading, SpeedRollup, TrafficObservation, TrafficVolume
+from api.partitions import expire_partitions
+from api.rollups import floor_time
+
+DAY = 86400
+
+# 15 minute volume buckets of whole days before the cutoff, deleted a batch of
+# (segment, sensor, day) groups at a time to be merged into one daily row
+COMPACT_VOLUME_SQL = """
+DELETE FROM {table}
+WHERE bucket < %(cutoff)s AND resolution = %(resolution)s
+AND (road_segment_id, sensor_id, date_trunc('day', bucket, 'UTC')) IN (
+    SELECT road_segment_id, sensor_id, date_trunc('day', bucket, 'UTC')
+    FROM {table}
+    WHERE bucket < %(cutoff)s AND resolution = %(resolution)s
+    GROUP BY 1, 2, 3
+    LIMIT %(limit)s
+)
+RETURNING road_segment_id, sensor_id, date_trunc('day', bucket, 'UTC'), count, cars
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Purge raw readings and observations, old rollups and compact traffic "
+        "volume according to RETENTION_POLICY"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.RETENTION_BATCH_SIZE,
+            help="Rows deleted per transaction",
+        )
+        parser.add_argument(
+            "--detach-only",
+            action="store_true",
+            help="Detach expired partitions instead of dropping them",
+        )
+
+    def handle(self, *args, **options):
+        policy = settings.RETENTION_POLICY
+        now = timezone.now()
+        self.batch_size = options["batch_size"]
+        self.detach_only = options["detach_only"]
+
+        if policy["speed_readings"] is not None:
+            self.purge_readings(now - timedelta(days=policy["speed_readings"]))
+
+        if policy["traffic_observations"] is not None:
+            cutoff = now - timedelta(days=policy["traffic_observations"])
+            self.expire_partitions(TrafficObservation, cutoff)
+            self.purge(
+                "traffic observations",
+                TrafficObservation.objects.filter(timestamp__lt=cutoff),
+            )
+
+        for name, days in policy["speed_rollups"].items():
+            if days is not None:
+                self.purge(
+                    f"{name} speed rollups",
+                    SpeedRollup.objects.filter(
+                        resolution=SpeedRollup.RESOLUTIONS[name],
+                        bucket__lt=now - timedelta(days=days),
+                    ),
+                )
+
+        if policy["traffic_volume"] is not None:
+            cutoff = now - timedelta(days=policy["traffic_volume"])
+            self.compact_volume(floor_time(cutoff, DAY))
+
+    def purge(self, label, queryset):
+        # Short transactions so writers are never blocked for long
+        model = queryset.model
+        total = 0
+        while True:
+            ids = list(queryset.values_list("pk", flat=True)[: self.batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                model.objects.filter(pk__in=ids).delete()
+            total += len(ids)
+        self.stdout.write(f"Deleted {total} {label}")
+
+    def expire_partitions(self, model, cutoff):
+        # Whole partitions past the cutoff go at once, the rest row by row
+        for name in expire_partitions(model, cutoff, self.detach_only):
+            self.stdout.write(f"Expired partition {name}")
+
+    def purge_readings(self, cutoff):
+        # The latest reading of every segment is kept, however old
+        self.expire_partitions(SpeedReading, cutoff)
+        self.purge(
+            "speed readings",
+            SpeedReading.objects.filter(created_at__lt=cutoff).filter(
+                created_at__lt=F("road_segment__latest_reading_at")
+            ),
+        )
+
+    def compact_volume(self, cutoff):
+        table = connection.ops.quote_name(TrafficVolume._meta.db_table)
+        sql = COMPACT_VOLUME_SQL.format(table=table)
+        params = {
+            "cutoff": cutoff,
+            "resolution": TrafficVolume.RESOLUTION,
+            "limit": self.batch_size,
+        }
+        total = 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                days = defaultdict(lambda: [0, HyperLogLog()])
+                for segment_id, sensor_id, day, count, cars in rows:
+                    current = days[(segment_id, sensor_id, day)]
+                    current[0] += count
+                    current[1].merge(HyperLogLog(bytes(cars)))
+
+                # Merged, a day may already hold a row from late observations
+                TrafficVolume.objects.merge(
+                    [
+                        (segment_id, sensor_id, TrafficVolume.COMPACTED_RESOLUTION)
+                        + (day, count, sketch.to_bytes())
+                        for (segment_id, sensor_id, day), (
+                            count,
+                            sketch,
+                        ) in days.items()
+                    ]
+                )
+            total += len(days)
+        self.stdout.write(f"Compacted traffic volume into {total} daily buckets")
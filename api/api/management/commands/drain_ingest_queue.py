@@ -0,0 +1,66 @@
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from api.queue import process_batches
+
+
+class Command(BaseCommand):
+    help = "Drain the traffic observation ingest queue with a pool of workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.INGEST_WORKERS,
+            help="Number of worker threads",
+        )
+        parser.add_argument(
+            "--max-rows",
+            type=int,
+            default=settings.INGEST_WORKER_MAX_ROWS,
+            help="Rows ingested per round before checking for new batches",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Stop once the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        workers = [
+            threading.Thread(
+                target=self.work,
+                args=(options["max_rows"], options["once"]),
+                daemon=True,
+            )
+            for _ in range(options["workers"])
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            for worker in workers:
+                while worker.is_alive():
+                    worker.join(1)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping ingest workers")
+
+    def work(self, max_rows, once):
+        try:
+            while True:
+                try:
+                    processed = process_batches(max_rows)
+                except DatabaseError as e:
+                    # Failing batches are handled by process_batches, this is
+                    # the database itself, wait on a fresh connection
+                    self.stderr.write(f"Ingest worker error: {e}")
+                    connection.close()
+                    processed = 0
+                if not processed:
+                    if once:
+                        return
+                    time.sleep(settings.INGEST_WORKER_IDLE_SLEEP)
+        finally:
+            connection.close()  # Each thread has its own connection
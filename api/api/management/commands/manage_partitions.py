@@ -0,0 +1,153 @@
+from datetime import timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from api.models import SpeedReading, TrafficObservation
+from api.partitions import list_partitions, quote
+
+# Append-only tables and the time column they are partitioned by
+PARTITIONED_TABLES = [(SpeedReading, "created_at"), (TrafficObservation, "timestamp")]
+
+
+class Command(BaseCommand):
+    help = (
+        "Partition time-series tables by day or week and create upcoming "
+        "partitions. apply_retention drops the expired ones"
+    )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        for model, column in PARTITIONED_TABLES:
+            table = model._meta.db_table
+            with transaction.atomic(), connection.cursor() as cursor:
+                if not self.is_partitioned(cursor, table):
+                    self.convert(cursor, table, column, now)
+                self.create_partitions(cursor, table, column, now)
+
+    def period_start(self, moment):
+        start = moment.astimezone(dt_timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        if settings.PARTITION_INTERVAL == "week":
+            start -= timedelta(days=start.weekday())
+        return start
+
+    def period_length(self):
+        if settings.PARTITION_INTERVAL == "week":
+            return timedelta(weeks=1)
+        return timedelta(days=1)
+
+    def is_partitioned(self, cursor, table):
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+    def convert(self, cursor, table, column, now):
+        """
+        Turn a plain table into a range partitioned one. The existing rows are
+        kept in place: the old table is attached as the partition holding
+        everything up to the end of the current period.
+        """
+        legacy = f"{table}_legacy"
+        self.stdout.write(f"Partitioning {table} by {column}")
+
+        cursor.execute(f"LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT max(id) FROM {quote(table)}")
+        max_id = cursor.fetchone()[0]
+        cursor.execute(
+            """
+            SELECT indexname, indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = %s
+            AND indexname != %s
+            """,
+            [table, f"{table}_pkey"],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+            """,
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+
+        # Free the table, index and sequence names for the partitioned table
+        cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}")
+        for name, _ in indexes + [(f"{table}_pkey", None)]:
+            cursor.execute(
+                f"ALTER INDEX {quote(name)} RENAME TO {quote(name[:56] + '_legacy')}"
+            )
+        cursor.execute(
+            f"ALTER TABLE {quote(legacy)} ALTER COLUMN id DROP IDENTITY IF EXISTS"
+        )
+
+        sequence = f"{table}_id_seq"
+        cursor.execute(
+            f"CREATE TABLE {quote(table)} (LIKE {quote(legacy)} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE ({quote(column)})"
+        )
+        cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {quote(sequence)}")
+        cursor.execute(f"ALTER SEQUENCE {quote(sequence)} OWNED BY {quote(table)}.id")
+        cursor.execute(
+            "SELECT setval(%s, %s, %s)", [sequence, max_id or 1, bool(max_id)]
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ALTER COLUMN id "
+            f"SET DEFAULT nextval('{sequence}')"
+        )
+        # The partition key has to be part of the primary key
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ADD PRIMARY KEY (id, {quote(column)})"
+        )
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(
+                f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}"
+            )
+
+        upper = self.period_start(now) + self.period_length()
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(legacy)} "
+            f"FOR VALUES FROM (MINVALUE) TO (%s)",
+            [upper],
+        )
+        cursor.execute(
+            f"CREATE TABLE {quote(table + '_default')} "
+            f"PARTITION OF {quote(table)} DEFAULT"
+        )
+
+    def create_partitions(self, cursor, table, column, now):
+        existing = list_partitions(cursor, table)
+        length = self.period_length()
+        start = self.period_start(now)
+
+        for i in range(settings.PARTITION_PREMAKE + 1):
+            lower, upper = start + i * length, start + (i + 1) * length
+            if any(
+                (low is None or low < upper) and (high is None or high > lower)
+                for _, low, high in existing
+            ):
+                continue
+
+            name = f"{table}_p{lower:%Y%m%d}"
+            self.stdout.write(f"Creating partition {name}")
+            cursor.execute(
+                f"CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS)"
+            )
+            # Rows that already landed in the default partition move over
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {quote(table + '_default')} "
+                f"WHERE {quote(column)} >= %s AND {quote(column)} < %s RETURNING *) "
+                f"INSERT INTO {quote(name)} SELECT * FROM moved",
+                [lower, upper],
+            )
+            cursor.execute(
+                f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [lower, upper],
+            )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import RoadSegment
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalized geometry and latest reading state of every "
+        "road segment"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Segments refreshed per transaction",
+        )
+
+    def handle(self, *args, **options):
+        updated = RoadSegment.objects.filter(geom__isnull=True).refresh_geom()
+        self.stdout.write(f"Backfilled the geometry of {updated} road segments")
+
+        ids = list(RoadSegment.objects.order_by("pk").values_list("pk", flat=True))
+        batch_size = options["batch_size"]
+        # Short transactions so readings keep flowing while it runs
+        for i in range(0, len(ids), batch_size):
+            with transaction.atomic():
+                RoadSegment.objects.filter(
+                    pk__in=ids[i : i + batch_size]
+                ).recompute_readings()
+        self.stdout.write(f"Refreshed {len(ids)} road segments")
@@ -0,0 +1,148 @@
+import hashlib
+import json
+from itertools import islice
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from .response_cache import response_cache_key, responses
+
+
+class NDJSONStreamMixin:
+    """
+    Opt-in streaming of a list endpoint as NDJSON with ``?stream=ndjson``.
+
+    Rows are read through a server-side cursor and serialized chunk by chunk,
+    so exporting a large table keeps worker memory flat.
+    """
+
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("stream") == "ndjson":
+            queryset = self.filter_queryset(self.get_queryset())
+            return StreamingHttpResponse(
+                self.stream_ndjson(queryset), content_type="application/x-ndjson"
+            )
+        return super().list(request, *args, **kwargs)
+
+    def stream_ndjson(self, queryset):
+        fast_serializer_class = getattr(self, "fast_serializer_class", None)
+        if fast_serializer_class:
+            fast_serializer = fast_serializer_class()
+            queryset = fast_serializer.values(queryset)
+
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        while True:
+            chunk = list(islice(rows, self.stream_chunk_size))
+            if not chunk:
+                return
+            if fast_serializer_class:
+                data = fast_serializer.serialize(chunk)
+            else:
+                data = self.get_serializer(chunk, many=True).data
+            yield "".join(json.dumps(item, cls=JSONEncoder) + "\n" for item in data)
+
+
+class FastListMixin:
+    """
+    Builds list responses with ``fast_serializer_class`` straight from
+    ``.values()`` rows, skipping model instances and field-by-field
+    serialization. Other actions keep ``serializer_class``.
+    """
+
+    fast_serializer_class = None
+    list_rows = None  # Rows of the last list, with their annotations
+
+    def get_list_annotations(self):
+        # Extra values read in the same query as the rows
+        return {}
+
+    def list(self, request, *args, **kwargs):
+        fast_serializer = self.fast_serializer_class()
+        queryset = fast_serializer.values(self.filter_queryset(self.get_queryset()))
+        queryset = queryset.annotate(**self.get_list_annotations())
+
+        # Cursor pagination reads the position from dict rows as well
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            self.list_rows = page
+            return self.get_paginated_response(fast_serializer.serialize(page))
+        self.list_rows = list(queryset)
+        return Response(fast_serializer.serialize(self.list_rows))
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified validators for read endpoints. The precondition
+    headers are checked before ``render`` runs, so an unchanged resource
+    answers 304 without running its queries or serializer.
+    """
+
+    def conditional(self, version, last_modified, render):
+        # The representation also depends on the negotiated format
+        key = f"{version}:{self.request.accepted_renderer.format}"
+        etag = f'"{hashlib.md5(key.encode()).hexdigest()}"'
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = render()
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = "no-cache"
+        return response
+
+
+class ResponseCacheMixin:
+    """
+    Serves list GETs of anonymous clients from the rendered responses in the
+    ``responses`` cache. Views wrap their list in ``cached`` and return the
+    cache group of a request from ``response_cache_group``, or None when it
+    must not be cached. It runs inside the handler, so the client is only
+    known to be anonymous once DRF authenticated the request.
+    """
+
+    cached_headers = ["ETag", "Last-Modified", "Cache-Control", "Vary"]
+
+    def response_cache_group(self, request):
+        return None
+
+    def cached(self, render):
+        request = self.request
+        group = None
+        if not request.user.is_authenticated and request.auth is None:
+            group = self.response_cache_group(request)
+        if group is None:
+            return render()
+
+        # The key holds the group generation read before the queries run
+        key = response_cache_key(group, request)
+        cached = responses.get(key)
+        if cached is not None:
+            content, content_type, headers = cached
+            response = get_conditional_response(
+                request,
+                etag=headers.get("ETag"),
+                last_modified=parse_http_date_safe(headers.get("Last-Modified")),
+            ) or HttpResponse(content, content_type=content_type)
+            for name, value in headers.items():
+                response[name] = value
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = render()
+        if response.status_code == 200 and not response.streaming:
+            # Rendered now to be stored, dispatch leaves it as it is
+            response = self.finalize_response(request, response)
+            response.render()
+            headers = {
+                name: response[name] for name in self.cached_headers if name in response
+            }
+            responses.set(key, (response.content, response["Content-Type"], headers))
+        response["X-Cache"] = "MISS"
+        return response
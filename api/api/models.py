@@ -1,5 +1,149 @@
-from django.db import models
+import hashlib
+import secrets
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection, models, transaction
+from django.db.models import Case, Count, F, Func, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
 from django.contrib.gis.db import models as gis_models
+from django.contrib.gis.geos import LineString, Polygon
+from django.contrib.gis.measure import D
+from .hll import HyperLogLog
+from .signals import readings_changed
+
+
+# PostGIS <-> distance operator, ordering by it walks the GiST index (KNN)
+class KNNDistance(Func):
+    arg_joiner = " <-> "
+    template = "(%(expressions)s)"
+    output_field = models.FloatField()
+
+
+# Geography line between two points, as RoadSegment.refresh_geom builds it
+class LineBetween(Func):
+    function = "ST_MakeLine"
+    template = "%(function)s(%(expressions)s)::geography"
+    output_field = gis_models.LineStringField(geography=True)
+
+
+class RoadSegmentQuerySet(models.QuerySet):
+    def refresh_readings(self, counts, since=None):
+        """
+        Apply reading count deltas and refresh the latest reading state.
+
+        ``counts`` maps road segment ids to the number of readings added
+        (negative when removed) since the segments were last refreshed.
+        ``since`` is the oldest added reading time; the latest reading lookup
+        is bounded by it so only recent partitions are scanned.
+        """
+        if not counts:
+            return
+
+        # Group segments by delta so the count update stays one statement
+        by_delta = defaultdict(list)
+        for segment_id, delta in counts.items():
+            by_delta[delta].append(segment_id)
+
+        latest = SpeedReading.objects.filter(road_segment=OuterRef("pk")).order_by(
+            "-created_at", "-id"
+        )
+        if since is not None:
+            latest = latest.filter(created_at__gte=since)
+        segments = self.filter(pk__in=list(counts))
+        # Labels the segments leave or enter, for precise invalidation
+        intensities = set(segments.values_list("intensity", flat=True).distinct())
+        segments.update(
+            readings_count=Case(
+                *[
+                    When(pk__in=ids, then=F("readings_count") + delta)
+                    for delta, ids in by_delta.items()
+                ],
+                default=F("readings_count"),
+            ),
+            latest_speed=Subquery(latest.values("speed")[:1]),
+            latest_reading_at=Subquery(latest.values("created_at")[:1]),
+            modified_at=Now(),
+        )
+        segments.refresh_intensity()
+        intensities.update(segments.values_list("intensity", flat=True).distinct())
+        readings_changed.send(
+            sender=RoadSegment, segment_ids=list(counts), intensities=intensities
+        )
+
+    def refresh_geom(self):
+        # For rows written before geom existed or through QuerySet.update()
+        return self.update(geom=LineBetween("start_point", "end_point"))
+
+    def recompute_readings(self):
+        """
+        Rebuild the latest reading state of the segments from SpeedReading,
+        for rows written before it was denormalized or drifted since.
+        """
+        readings = SpeedReading.objects.filter(road_segment=OuterRef("pk"))
+        latest = readings.order_by("-created_at", "-id")
+        count = readings.order_by().values("road_segment").annotate(n=Count("id"))
+        segment_ids = list(self.values_list("pk", flat=True))
+        segments = RoadSegment.objects.filter(pk__in=segment_ids)
+        intensities = set(segments.values_list("intensity", flat=True).distinct())
+        segments.update(
+            readings_count=Coalesce(Subquery(count.values("n")), 0),
+            latest_speed=Subquery(latest.values("speed")[:1]),
+            latest_reading_at=Subquery(latest.values("created_at")[:1]),
+            modified_at=Now(),
+        )
+        segments.refresh_intensity()
+        intensities.update(segments.values_list("intensity", flat=True).distinct())
+        readings_changed.send(
+            sender=RoadSegment, segment_ids=segment_ids, intensities=intensities
+        )
+
+    def filter_intensity(self, intensity, threshold=None):
+        # Speed ranges rather than the stored label so the latest_speed index
+        # is used and results always follow the current threshold, read by
+        # the query itself unless given
+        if threshold is not None:
+            medium_min, medium_max = threshold.medium_min, threshold.medium_max
+        else:
+            medium_min = TrafficIntensityThreshold.current_bound("medium_min")
+            medium_max = TrafficIntensityThreshold.current_bound("medium_max")
+        if intensity == "low":
+            return self.filter(latest_speed__gt=medium_max)
+        elif intensity == "medium":
+            return self.filter(
+                latest_speed__gt=medium_min, latest_speed__lte=medium_max
+            )
+        elif intensity == "high":
+            return self.filter(latest_speed__lte=medium_min)
+        return self.filter(latest_speed__isnull=True)
+
+    def in_bbox(self, min_lon, min_lat, max_lon, max_lat):
+        bbox = Polygon.from_bbox((min_lon, min_lat, max_lon, max_lat))
+        bbox.srid = 4326
+        return self.filter(geom__intersects=bbox)
+
+    def near(self, point, radius):
+        # Radius in meters, geom is a geography column
+        return self.filter(geom__dwithin=(point, D(m=radius)))
+
+    def nearest(self, point, k):
+        location = Value(
+            point, output_field=gis_models.GeometryField(srid=4326, geography=True)
+        )
+        return self.order_by(KNNDistance("geom", location))[:k]
+
+    def refresh_intensity(self):
+        # The threshold is read by the statement itself, never from a cached
+        # copy another process may not have dropped yet
+        intensity = TrafficIntensityThreshold.intensity_expression("latest_speed")
+        # Only touch the segments whose label changes, so their validators do
+        return self.exclude(intensity=intensity).update(
+            intensity=intensity, modified_at=Now()
+        )
 
 
 class RoadSegment(models.Model):
@@ -7,41 +151,197 @@ class RoadSegment(models.Model):
     end_point = gis_models.PointField(null=False, blank=False)
     length = models.FloatField(default=0.0, null=False, blank=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Any change to the serialized segment, for ETag / Last-Modified
+    modified_at = models.DateTimeField(auto_now=True)
+    # Line between both points, GiST indexed for spatial queries
+    geom = gis_models.LineStringField(geography=True, null=True, editable=False)
+
+    # Latest reading state, kept up to date on every SpeedReading write
+    latest_speed = models.FloatField(null=True, blank=True, editable=False)
+    latest_reading_at = models.DateTimeField(null=True, blank=True, editable=False)
+    readings_count = models.PositiveIntegerField(default=0, editable=False)
+    intensity = models.CharField(max_length=10, default="no_data", editable=False)
+
+    objects = RoadSegmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=["latest_speed"], name="segment_speed_idx")]
+
+    def save(self, *args, **kwargs):
+        self.refresh_geom()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"start_point", "end_point"} & set(
+            update_fields
+        ):
+            kwargs["update_fields"] = {*update_fields, "geom"}
+        super().save(*args, **kwargs)
+
+    def refresh_geom(self):
+        self.geom = LineString(
+            self.start_point.coords, self.end_point.coords, srid=4326
+        )
 
     @property
     def current_speed(self):
-        last_reading = self.readings.order_by("-created_at").first()
-        return last_reading.speed if last_reading else None
+        return self.latest_speed
 
     @property
     def traffic_intensity(self):
-        speed = self.current_speed
-        if speed is None:
-            return "no_data"
-
-        thresholds = TrafficIntensityThreshold.current()
-
-        if speed > thresholds.medium_max:
-            return "low"
-        elif speed <= thresholds.medium_max and speed > thresholds.medium_min:
-            return "medium"
-        return "high"
+        return self.intensity
 
     @property
     def updated_at(self):
-        last_reading = self.readings.order_by("-created_at").first()
-        return last_reading.created_at if last_reading else self.created_at
+        return self.latest_reading_at or self.created_at
+
+
+class SpeedReadingQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            if objs:
+                RoadSegment.objects.refresh_readings(
+                    Counter(reading.road_segment_id for reading in objs),
+                    since=min(reading.created_at for reading in objs),
+                )
+                SpeedRollup.objects.record(objs)
+        return objs
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            counts = Counter(self.values_list("road_segment_id", flat=True))
+            result = super().delete()
+            RoadSegment.objects.refresh_readings(
+                {segment_id: -count for segment_id, count in counts.items()}
+            )
+        return result
 
 
 class SpeedReading(models.Model):
     road_segment = models.ForeignKey(
-        RoadSegment, related_name="readings", on_delete=models.CASCADE
+        RoadSegment,
+        related_name="readings",
+        on_delete=models.CASCADE,
+        db_index=False,  # Covered by speedreading_segment_idx
     )
     speed = models.FloatField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by bulk ingest for readings measured before they were sent
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = SpeedReadingQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Latest readings of a segment, answered from the index alone
+            models.Index(
+                fields=["road_segment", "-created_at", "-id"],
+                include=["speed"],
+                name="speedreading_segment_idx",
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                RoadSegment.objects.refresh_readings(
+                    {self.road_segment_id: 1}, since=self.created_at
+                )
+                SpeedRollup.objects.record([self])
+            else:
+                RoadSegment.objects.refresh_readings({self.road_segment_id: 0})
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            RoadSegment.objects.refresh_readings({self.road_segment_id: -1})
+        return result
+
+
+class SpeedRollupQuerySet(models.QuerySet):
+    def record(self, readings):
+        """
+        Fold new readings into their buckets at every resolution with one
+        upsert per chunk, so no bucket is ever recomputed from raw readings.
+        """
+        buckets = {}
+        for reading in readings:
+            timestamp = int(reading.created_at.timestamp())
+            for resolution in SpeedRollup.RESOLUTIONS.values():
+                bucket = datetime.fromtimestamp(
+                    timestamp - timestamp % resolution, tz=dt_timezone.utc
+                )
+                key = (reading.road_segment_id, resolution, bucket)
+                current = buckets.get(key)
+                if current is None:
+                    buckets[key] = [
+                        1,
+                        reading.speed,
+                        reading.speed,
+                        reading.speed,
+                        reading.speed,
+                        reading.created_at,
+                    ]
+                    continue
+                current[0] += 1
+                current[1] += reading.speed
+                current[2] = min(current[2], reading.speed)
+                current[3] = max(current[3], reading.speed)
+                if reading.created_at >= current[5]:
+                    current[4], current[5] = reading.speed, reading.created_at
+
+        rows = [key + tuple(values) for key, values in buckets.items()]
+        table = connection.ops.quote_name(SpeedRollup._meta.db_table)
+        with connection.cursor() as cursor:
+            for i in range(0, len(rows), 1000):
+                chunk = rows[i : i + 1000]
+                placeholders = ", ".join(
+                    ["(%s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(chunk)
+                )
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table} AS r (road_segment_id, resolution, bucket,
+                        count, speed_sum, speed_min, speed_max, last_speed, last_at)
+                    VALUES {placeholders}
+                    ON CONFLICT (road_segment_id, resolution, bucket) DO UPDATE SET
+                        count = r.count + EXCLUDED.count,
+                        speed_sum = r.speed_sum + EXCLUDED.speed_sum,
+                        speed_min = LEAST(r.speed_min, EXCLUDED.speed_min),
+                        speed_max = GREATEST(r.speed_max, EXCLUDED.speed_max),
+                        last_speed = CASE WHEN EXCLUDED.last_at >= r.last_at
+                            THEN EXCLUDED.last_speed ELSE r.last_speed END,
+                        last_at = GREATEST(r.last_at, EXCLUDED.last_at)
+                    """,
+                    [value for row in chunk for value in row],
+                )
+
+
+class SpeedRollup(models.Model):
+    # Bucket sizes in seconds, from finest to coarsest
+    RESOLUTIONS = {"1m": 60, "15m": 900, "1h": 3600, "1d": 86400}
+
+    road_segment = models.ForeignKey(
+        RoadSegment, related_name="rollups", on_delete=models.CASCADE, db_index=False
+    )
+    resolution = models.PositiveIntegerField()
+    bucket = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    speed_sum = models.FloatField()
+    speed_min = models.FloatField()
+    speed_max = models.FloatField()
+    last_speed = models.FloatField()
+    last_at = models.DateTimeField()
+
+    objects = SpeedRollupQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["road_segment", "resolution", "bucket"],
+                name="speedrollup_bucket_unique",
+            )
+        ]
 
 
 class TrafficIntensityThreshold(models.Model):
@@ -49,12 +349,65 @@ class TrafficIntensityThreshold(models.Model):
     medium_max = models.FloatField(default=50.0)  # Medium max and low min are the same
     created_at = models.DateTimeField(auto_now=True)
 
+    CACHE_KEY = "traffic-intensity-threshold"
+
+    # Process-local copy of the current threshold as (threshold, expires_at)
+    _local_cache = None
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["-created_at"], name="threshold_created_idx")]
 
     @classmethod
     def current(cls):
-        return cls.objects.first() or cls()
+        # Process-local copy first, then the shared cache, then the database.
+        # Other workers see a new threshold once their local copy expires.
+        now = time.monotonic()
+        if cls._local_cache and cls._local_cache[1] > now:
+            return cls._local_cache[0]
+
+        threshold = cache.get(cls.CACHE_KEY)
+        if threshold is None:
+            threshold = cls.objects.first() or cls()
+            cache.set(cls.CACHE_KEY, threshold, settings.THRESHOLD_CACHE_TIMEOUT)
+
+        cls._local_cache = (threshold, now + settings.THRESHOLD_LOCAL_CACHE_TIMEOUT)
+        return threshold
+
+    @classmethod
+    def invalidate_cache(cls):
+        cls._local_cache = None
+        cache.delete(cls.CACHE_KEY)
+
+    def classify(self, speed):
+        if speed is None:
+            return "no_data"
+        if speed > self.medium_max:
+            return "low"
+        elif speed > self.medium_min:
+            return "medium"
+        return "high"
+
+    # A bound of the latest threshold (or the default) as a subquery, for
+    # statements that must not depend on a cached copy
+    @classmethod
+    def current_bound(cls, name):
+        latest = cls.objects.order_by("-created_at").values(name)[:1]
+        return Coalesce(Subquery(latest), Value(cls._meta.get_field(name).default))
+
+    # SQL equivalent of classify() for the given speed column, with the bounds
+    # of the latest threshold read in the same statement
+    @classmethod
+    def intensity_expression(cls, field):
+        medium_min = cls.current_bound("medium_min")
+        medium_max = cls.current_bound("medium_max")
+        return Case(
+            When(**{f"{field}__isnull": True}, then=Value("no_data")),
+            When(**{f"{field}__gt": medium_max}, then=Value("low")),
+            When(**{f"{field}__gt": medium_min}, then=Value("medium")),
+            default=Value("high"),
+            output_field=models.CharField(),
+        )
 
     # Validation of the model
     def clean(self):
@@ -68,7 +421,13 @@ class TrafficIntensityThreshold(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()  # Before saving, call clean() to validate the model
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            RoadSegment.objects.refresh_intensity()
+
+            # Again on commit, in case another request cached the old row
+            self.invalidate_cache()
+            transaction.on_commit(self.invalidate_cache)
 
 
 class Sensor(models.Model):
@@ -76,6 +435,29 @@ class Sensor(models.Model):
     name = models.CharField(max_length=100)
     uuid = models.UUIDField(unique=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # SHA-256 of the sensor's API key, the key itself is never stored
+    api_key_hash = models.CharField(
+        max_length=64, unique=True, null=True, blank=True, editable=False
+    )
+
+    @staticmethod
+    def hash_api_key(api_key):
+        # Keys are random 256 bit tokens, a plain digest is enough
+        return hashlib.sha256(api_key.encode()).hexdigest()
+
+    def issue_api_key(self):
+        """
+        Generate a new API key, replacing the previous one. The key is only
+        returned here.
+        """
+        api_key = secrets.token_urlsafe(32)
+        self.api_key_hash = self.hash_api_key(api_key)
+        self.save(update_fields=["api_key_hash"])
+        return api_key
+
+    def revoke_api_key(self):
+        self.api_key_hash = None
+        self.save(update_fields=["api_key_hash"])
 
 
 class Car(models.Model):
@@ -83,12 +465,190 @@ class Car(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
 
+class TrafficObservationQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            TrafficVolume.objects.record(objs)
+        return objs
+
+
 class TrafficObservation(models.Model):
-    road_segment = models.ForeignKey(RoadSegment, on_delete=models.CASCADE)
-    car = models.ForeignKey(Car, on_delete=models.CASCADE)
+    # Segment and car lookups are covered by the composite indexes below
+    road_segment = models.ForeignKey(
+        RoadSegment, on_delete=models.CASCADE, db_index=False
+    )
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, db_index=False)
     sensor = models.ForeignKey(Sensor, on_delete=models.CASCADE)
     timestamp = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TrafficObservationQuerySet.as_manager()
+
     class Meta:
         ordering = ["-timestamp"]
+        indexes = [
+            models.Index(
+                fields=["car", "-timestamp"],
+                include=["road_segment", "sensor"],
+                name="observation_car_idx",
+            ),
+            models.Index(
+                fields=["road_segment", "-timestamp"], name="observation_segment_idx"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                TrafficVolume.objects.record([self])
+
+
+class TrafficVolumeQuerySet(models.QuerySet):
+    def record(self, observations):
+        """
+        Add observations to the vehicle count and distinct car sketch of their
+        segment, sensor and 15 minute bucket.
+        """
+        buckets = {}
+        for observation in observations:
+            timestamp = int(observation.timestamp.timestamp())
+            bucket = datetime.fromtimestamp(
+                timestamp - timestamp % TrafficVolume.RESOLUTION, tz=dt_timezone.utc
+            )
+            key = (observation.road_segment_id, observation.sensor_id, bucket)
+            current = buckets.get(key)
+            if current is None:
+                current = buckets[key] = [0, HyperLogLog()]
+            current[0] += 1
+            current[1].add(observation.car_id)
+
+        self.merge(
+            [
+                (segment_id, sensor_id, TrafficVolume.RESOLUTION, bucket)
+                + (count, sketch.to_bytes())
+                for (segment_id, sensor_id, bucket), (count, sketch) in buckets.items()
+            ]
+        )
+
+    def merge(self, rows):
+        """
+        Add ``(road_segment_id, sensor_id, resolution, bucket, count, cars)``
+        rows to the stored buckets, merged in the database by one upsert per
+        chunk.
+        """
+        table = connection.ops.quote_name(TrafficVolume._meta.db_table)
+        with connection.cursor() as cursor:
+            for i in range(0, len(rows), 500):
+                chunk = rows[i : i + 500]
+                placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(chunk))
+                # Sketches merge by keeping the larger byte of each register
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table} AS v
+                        (road_segment_id, sensor_id, resolution, bucket, count, cars)
+                    VALUES {placeholders}
+                    ON CONFLICT (road_segment_id, sensor_id, resolution, bucket)
+                    DO UPDATE SET
+                        count = v.count + EXCLUDED.count,
+                        cars = (
+                            SELECT decode(string_agg(lpad(to_hex(GREATEST(
+                                get_byte(v.cars, i), get_byte(EXCLUDED.cars, i)
+                            )), 2, '0'), '' ORDER BY i), 'hex')
+                            FROM generate_series(0, length(v.cars) - 1) AS i
+                        )
+                    """,
+                    [value for row in chunk for value in row],
+                )
+
+
+class TrafficVolume(models.Model):
+    RESOLUTION = 900  # 15 minute buckets
+    COMPACTED_RESOLUTION = 86400  # Daily buckets left by apply_retention
+
+    road_segment = models.ForeignKey(
+        RoadSegment, on_delete=models.CASCADE, db_index=False
+    )
+    sensor = models.ForeignKey(Sensor, on_delete=models.CASCADE, db_index=False)
+    # Width of the bucket in seconds
+    resolution = models.PositiveIntegerField(default=RESOLUTION)
+    bucket = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    cars = models.BinaryField()  # HyperLogLog registers of the car ids
+
+    objects = TrafficVolumeQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["road_segment", "sensor", "resolution", "bucket"],
+                name="trafficvolume_bucket_unique",
+            )
+        ]
+        indexes = [models.Index(fields=["sensor", "bucket"], name="volume_sensor_idx")]
+
+
+class IngestBatch(models.Model):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (DONE, "Done"), (FAILED, "Failed")]
+
+    # Client supplied key, a batch is only ever stored and processed once
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    payload = models.JSONField()
+    size = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Failed attempts are retried with a backoff, not before this time
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(status="pending"),
+                name="ingestbatch_pending_idx",
+            )
+        ]
+
+
+class VersionQuerySet(models.QuerySet):
+    def bump(self, name):
+        # Row locked until commit, concurrent writers queue on it briefly
+        table = connection.ops.quote_name(Version._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} AS v (name, value) VALUES (%s, 1)
+                ON CONFLICT (name) DO UPDATE SET value = v.value + 1
+                """,
+                [name],
+            )
+
+    def value(self, name):
+        return self.filter(pk=name).values_list("value", flat=True).first() or 0
+
+    def subquery(self, name):
+        # For reading the version in the same statement as the rows it covers
+        return Coalesce(Subquery(self.filter(pk=name).values("value")[:1]), 0)
+
+
+class Version(models.Model):
+    """
+    Counters bumped in the same transaction as the writes they cover, so
+    every process reads the same version of the data from the database.
+    """
+
+    SEGMENTS = "segments"  # Any change to the listed road segments
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    objects = VersionQuerySet.as_manager()
@@ -0,0 +1,135 @@
+from django.db.models import BooleanField, F, Func, Value
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class RowComparison(Func):
+    # (a, b) < (c, d) as one row comparison, a single range of a composite index
+    output_field = BooleanField()
+
+    def __init__(self, fields, operator, values):
+        self.operator = operator
+        super().__init__(*[F(field) for field in fields], *map(Value, values))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = [], []
+        for expression in self.get_source_expressions():
+            expression_sql, expression_params = compiler.compile(expression)
+            sql.append(expression_sql)
+            params.extend(expression_params)
+        half = len(sql) // 2
+        left, right = ", ".join(sql[:half]), ", ".join(sql[half:])
+        return f"({left}) {self.operator} ({right})", params
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination on ``(created_at, id)``. DRF's cursor only holds the
+    first ordering field and steps over ties with an offset, which stops at
+    ``offset_cutoff``. Here the cursor holds both values, every position is
+    unique and a page is always ``WHERE (created_at, id) < (%s, %s)``.
+    """
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = ("-created_at", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = (0, False, None)
+        else:
+            offset, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            # Both fields sort the same way, as in the composite indexes
+            descending = self.ordering[0].startswith("-")
+            queryset = queryset.filter(
+                RowComparison(
+                    [field.lstrip("-") for field in self.ordering],
+                    "<" if reverse != descending else ">",
+                    self.parse_position(current_position),
+                )
+            )
+
+        # One extra row tells whether a page follows
+        results = list(queryset[offset : offset + self.page_size + 1])
+        self.page = list(results[: self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _get_position_from_instance(self, instance, ordering):
+        # "<isoformat time>|<id>", with both values the position never repeats
+        values = []
+        for field in ordering:
+            field = field.lstrip("-")
+            value = (
+                instance[field]
+                if isinstance(instance, dict)
+                else getattr(instance, field)
+            )
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return "|".join(map(str, values))
+
+    def parse_position(self, position):
+        try:
+            time, pk = position.split("|")
+            time, pk = parse_datetime(time), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if time is None:
+            raise NotFound(self.invalid_cursor_message)
+        return time, pk
+
+
+class TimestampCursorPagination(CreatedAtCursorPagination):
+    ordering = ("-timestamp", "-id")
+
+
+def reverse_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith("-") else f"-{field}" for field in ordering
+    )
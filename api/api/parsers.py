@@ -0,0 +1,45 @@
+import codecs
+import csv
+import json
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    One JSON object per line, parsed into a list of objects.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        rows = []
+        lines = enumerate(codecs.getreader(encoding)(stream), start=1)
+        try:
+            for number, line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError as e:
+                    raise ParseError(f"NDJSON parse error on line {number} - {e}")
+        except UnicodeDecodeError as e:
+            raise ParseError(f"NDJSON parse error - {e}")
+        return rows
+
+
+class CSVParser(BaseParser):
+    """
+    CSV with a header row, parsed into a list of objects keyed by column.
+    """
+
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        try:
+            return list(csv.DictReader(codecs.getreader(encoding)(stream)))
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise ParseError(f"CSV parse error - {e}")
@@ -0,0 +1,97 @@
+import re
+from datetime import datetime
+from django.db import connection, transaction
+from .models import RoadSegment, SpeedReading
+from .signals import readings_changed
+
+BOUND = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+def parse_bound(value):
+    if value == "MINVALUE":
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+def list_partitions(cursor, table):
+    # (name, lower, upper) of every range partition, None for MINVALUE
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        """,
+        [table],
+    )
+    result = []
+    for name, bound in cursor.fetchall():
+        match = BOUND.search(bound)
+        if match:  # The default partition has no range
+            lower, upper = match.groups()
+            result.append((name, parse_bound(lower), parse_bound(upper)))
+    return result
+
+
+def expire_partitions(model, cutoff, detach_only=False):
+    """
+    Detach, and unless ``detach_only`` drop, the partitions of ``model`` that
+    only hold rows older than ``cutoff``. Returns their names.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        expired = [
+            (name, upper)
+            for name, _, upper in list_partitions(cursor, table)
+            if upper is not None and upper <= cutoff
+        ]
+
+    for name, upper in expired:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+            if model is SpeedReading:
+                keep_latest_readings(cursor, table, name, upper)
+            if not detach_only:
+                cursor.execute(f"DROP TABLE {quote(name)}")
+    return [name for name, _ in expired]
+
+
+def keep_latest_readings(cursor, table, name, upper):
+    """
+    Move the latest reading of every segment out of a detached partition,
+    so segments keep their current speed however old it is, and take the
+    other readings off the segment counts.
+    """
+    segments = quote(RoadSegment._meta.db_table)
+    # Check the moved rows now, no deferred trigger events are left
+    # pending while the next partitions are detached
+    cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    cursor.execute(
+        f"INSERT INTO {quote(table)} "
+        f"SELECT DISTINCT ON (r.road_segment_id) r.* FROM {quote(name)} AS r "
+        f"JOIN {segments} AS s ON s.id = r.road_segment_id "
+        f"WHERE s.latest_reading_at < %s "
+        f"ORDER BY r.road_segment_id, r.created_at DESC, r.id DESC "
+        f"RETURNING id",
+        [upper],
+    )
+    kept = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        f"UPDATE {segments} AS s "
+        f"SET readings_count = s.readings_count - c.n, modified_at = now() "
+        f"FROM (SELECT road_segment_id, count(*) AS n FROM {quote(name)} "
+        f"WHERE id <> ALL(%s::bigint[]) GROUP BY road_segment_id) AS c "
+        f"WHERE s.id = c.road_segment_id "
+        f"RETURNING s.id, s.intensity",
+        [kept],
+    )
+    changed = cursor.fetchall()
+    if changed:
+        readings_changed.send(
+            sender=RoadSegment,
+            segment_ids=[segment_id for segment_id, _ in changed],
+            intensities={intensity for _, intensity in changed},
+        )
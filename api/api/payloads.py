@@ -0,0 +1,77 @@
+from .models import TrafficObservation
+
+# Plain dict builders shared by the sync and async read views. They produce
+# the same JSON as the matching serializers.
+
+
+def road_segment_payload(segment):
+    return {
+        "id": segment.id,
+        "current_speed": segment.current_speed,
+        "traffic_intensity": segment.traffic_intensity,
+        "readings_count": segment.readings_count,
+        "updated_at": segment.updated_at,
+        "start_point": str(segment.start_point),
+        "end_point": str(segment.end_point),
+        "length": segment.length,
+        "created_at": segment.created_at,
+    }
+
+
+def threshold_payload(threshold):
+    return {
+        "id": threshold.id,
+        "medium_min": threshold.medium_min,
+        "medium_max": threshold.medium_max,
+        "created_at": threshold.created_at,
+    }
+
+
+def car_observations(car, since):
+    # One join, the segment state comes from its latest reading columns
+    return (
+        TrafficObservation.objects.filter(car=car, timestamp__gte=since)
+        .order_by("-timestamp")
+        .values_list(
+            "timestamp",
+            "road_segment_id",
+            "road_segment__length",
+            "road_segment__latest_speed",
+            "road_segment__intensity",
+            "sensor__uuid",
+            "sensor__name",
+        )
+    )
+
+
+def car_observations_payload(car, observations):
+    return {
+        "car": {
+            "license_plate": car.license_plate,
+            "created_at": car.created_at,
+        },
+        "observations": [
+            {
+                "timestamp": timestamp,
+                "road_segment": {
+                    "id": segment_id,
+                    "length": length,
+                    "current_speed": current_speed,
+                    "traffic_intensity": traffic_intensity,
+                },
+                "sensor": {
+                    "uuid": str(sensor_uuid),
+                    "name": sensor_name,
+                },
+            }
+            for (
+                timestamp,
+                segment_id,
+                length,
+                current_speed,
+                traffic_intensity,
+                sensor_uuid,
+                sensor_name,
+            ) in observations
+        ],
+    }
@@ -1,5 +1,5 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
-from django.conf import settings
+from .sensor_keys import verify_api_key
 
 
 class IsAdminOrReadOnly(BasePermission):
@@ -12,6 +12,7 @@ class IsAdminOrReadOnly(BasePermission):
 class SensorAPIOnlyPermission(BasePermission):
     def has_permission(self, request, view):
         if request.method in ["POST"]:
-            api_key = request.headers.get("X-API-KEY")
-            return api_key == settings.API_KEY_SENSOR
+            # The verified sensor, for views that check what it submits
+            request.sensor = verify_api_key(request.headers.get("X-API-KEY"))
+            return request.sensor is not None
         return True
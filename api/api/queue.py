@@ -0,0 +1,138 @@
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.utils import timezone
+from .ingest import ingest_observations
+from .models import IngestBatch
+
+# Process-local copy of the pending row count as (rows, latency, expires_at),
+# the latency of that query doubles as a database health probe
+_depth_cache = None
+
+
+class QueueFull(Exception):
+    pass
+
+
+def refresh_depth():
+    global _depth_cache
+    now = time.monotonic()
+    if _depth_cache is None or _depth_cache[2] <= now:
+        rows = IngestBatch.objects.filter(status=IngestBatch.PENDING).aggregate(
+            rows=Sum("size")
+        )["rows"]
+        latency = time.monotonic() - now
+        _depth_cache = (rows or 0, latency, now + 1)
+    return _depth_cache
+
+
+def pending_rows():
+    return refresh_depth()[0]
+
+
+def database_latency():
+    # Seconds the last pending row count took
+    return refresh_depth()[1]
+
+
+def enqueue(rows, idempotency_key=None):
+    """
+    Store a batch of raw observations for the ingest workers.
+
+    Resubmitting a key returns the stored batch instead of queueing it again.
+    Raises QueueFull when the pending rows exceed ``INGEST_QUEUE_MAX_ROWS``.
+    """
+    idempotency_key = idempotency_key or str(uuid.uuid4())
+    batch = IngestBatch.objects.filter(idempotency_key=idempotency_key).first()
+    if batch:
+        return batch
+
+    if pending_rows() + len(rows) > settings.INGEST_QUEUE_MAX_ROWS:
+        raise QueueFull()
+
+    IngestBatch.objects.bulk_create(
+        [IngestBatch(idempotency_key=idempotency_key, payload=rows, size=len(rows))],
+        ignore_conflicts=True,  # Concurrent resubmission of the same key
+    )
+    return IngestBatch.objects.get(idempotency_key=idempotency_key)
+
+
+def process_batches(max_rows):
+    """
+    Ingest due batches, one transaction each, until ``max_rows`` rows were
+    processed or none is left. Returns the number of processed batches.
+    """
+    processed, rows = 0, 0
+    while rows < max_rows and processed < settings.INGEST_WORKER_MAX_BATCHES:
+        batch = process_batch()
+        if batch is None:
+            break
+        processed += 1
+        rows += batch.size
+    return processed
+
+
+def process_batch():
+    """
+    Claim the next due batch and ingest it in its own transaction, marking it
+    done in that same transaction so it is applied exactly once. A failure,
+    including deferred constraint errors raised by the commit, only sets this
+    batch back for a later retry. Returns the batch, or None when none is due.
+    """
+    batch = None
+    try:
+        with transaction.atomic():
+            batch = (
+                IngestBatch.objects.select_for_update(skip_locked=True)
+                .filter(status=IngestBatch.PENDING, next_attempt_at__lte=timezone.now())
+                .order_by("id")
+                .first()
+            )
+            if batch is None:
+                return None
+
+            created, rejected = ingest_observations(batch.payload)
+            batch.status = IngestBatch.DONE
+            batch.result = {"created": created, "rejected": rejected}
+            batch.processed_at = timezone.now()
+            batch.attempts += 1
+            batch.save(update_fields=["status", "result", "processed_at", "attempts"])
+    except Exception as e:
+        if batch is None:
+            raise  # Nothing was claimed, e.g. the database is unreachable
+        record_failure(batch, e)
+    return batch
+
+
+def record_failure(batch, error):
+    # Exponential backoff, the batch fails for good after the last attempt
+    attempts = IngestBatch.objects.get(pk=batch.pk).attempts + 1
+    status = IngestBatch.PENDING
+    if attempts >= settings.INGEST_WORKER_MAX_ATTEMPTS:
+        status = IngestBatch.FAILED
+    delay = settings.INGEST_WORKER_RETRY_BACKOFF * 2 ** (attempts - 1)
+    IngestBatch.objects.filter(pk=batch.pk).update(
+        attempts=attempts,
+        status=status,
+        result={"error": str(error)},
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def queue_metrics():
+    pending = IngestBatch.objects.filter(status=IngestBatch.PENDING).aggregate(
+        batches=Count("id"), rows=Sum("size"), oldest=Min("created_at")
+    )
+    oldest = pending["oldest"]
+    return {
+        "pending_batches": pending["batches"],
+        "pending_rows": pending["rows"] or 0,
+        "oldest_pending_seconds": (
+            (timezone.now() - oldest).total_seconds() if oldest else 0
+        ),
+        "failed_batches": IngestBatch.objects.filter(status=IngestBatch.FAILED).count(),
+        "max_rows": settings.INGEST_QUEUE_MAX_ROWS,
+    }
@@ -0,0 +1,73 @@
+import hashlib
+import time
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.connection import ConnectionProxy
+from .models import RoadSegment, TrafficIntensityThreshold
+from .signals import readings_changed
+
+# Rendered responses are grouped by what they depend on. Each group has a
+# generation in its key, bumping it drops every response of the group.
+SEGMENTS = "segments"
+INTENSITIES = ["low", "medium", "high"]
+THRESHOLDS = "thresholds"
+
+# Generations live next to the responses, so every process must share the
+# cache for them to see each other's invalidations
+responses = ConnectionProxy(caches, "responses")
+
+
+def intensity_group(intensity):
+    return f"{SEGMENTS}:{intensity}"
+
+
+def group_generation(group):
+    # Seeded from the clock so an evicted generation is never reused
+    return responses.get_or_set(f"generation:{group}", time.time_ns, None)
+
+
+def response_cache_key(group, request):
+    variant = f"{request.path}?{request.META.get('QUERY_STRING', '')}"
+    variant += f":{request.META.get('HTTP_ACCEPT', '')}"
+    digest = hashlib.md5(variant.encode()).hexdigest()
+    return f"response:{group}:{group_generation(group)}:{digest}"
+
+
+def invalidate(groups):
+    generation = time.time_ns()
+    responses.set_many({f"generation:{group}": generation for group in groups}, None)
+
+
+def invalidate_now_and_on_commit(groups):
+    # Again on commit, in case another request cached the old rows meanwhile
+    invalidate(groups)
+    transaction.on_commit(lambda: invalidate(groups))
+
+
+@receiver(readings_changed)
+def readings_changed_responses(sender, segment_ids, intensities=(), **kwargs):
+    # Unfiltered lists and the intensity lists the segments left or entered
+    groups = [SEGMENTS] + [
+        intensity_group(intensity)
+        for intensity in intensities
+        if intensity in INTENSITIES
+    ]
+    invalidate_now_and_on_commit(groups)
+
+
+@receiver(post_save, sender=RoadSegment)
+@receiver(post_delete, sender=RoadSegment)
+def segment_changed_responses(sender, instance, **kwargs):
+    groups = [SEGMENTS]
+    if instance.intensity in INTENSITIES:
+        groups.append(intensity_group(instance.intensity))
+    invalidate_now_and_on_commit(groups)
+
+
+# A new threshold relabels every segment
+@receiver(post_save, sender=TrafficIntensityThreshold)
+def threshold_changed_responses(sender, **kwargs):
+    groups = [SEGMENTS, THRESHOLDS] + [intensity_group(i) for i in INTENSITIES]
+    invalidate_now_and_on_commit(groups)
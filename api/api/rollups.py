@@ -0,0 +1,123 @@
+import re
+from datetime import datetime, timezone as dt_timezone
+from .hll import HyperLogLog
+from .models import SpeedRollup, TrafficVolume
+
+RESOLUTION = re.compile(r"^(\d+)([mhd])$")
+UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400}
+MAX_BUCKETS = 5000
+
+
+def parse_resolution(value):
+    # "15m", "2h", "1d"... in seconds, None when invalid
+    match = RESOLUTION.match(value or "")
+    if not match or int(match.group(1)) == 0:
+        return None
+    return int(match.group(1)) * UNIT_SECONDS[match.group(2)]
+
+
+def source_resolution(resolution):
+    # Coarsest stored resolution that evenly divides the requested one
+    return max(
+        stored
+        for stored in SpeedRollup.RESOLUTIONS.values()
+        if resolution % stored == 0
+    )
+
+
+def floor_time(moment, resolution):
+    timestamp = int(moment.timestamp())
+    return datetime.fromtimestamp(
+        timestamp - timestamp % resolution, tz=dt_timezone.utc
+    )
+
+
+def speed_history(segment_id, resolution, start, end):
+    """
+    Speed statistics of a segment per ``resolution`` seconds bucket between
+    ``start`` and ``end``, merged from the coarsest stored rollups that fit.
+    """
+    source = source_resolution(resolution)
+    rollups = (
+        SpeedRollup.objects.filter(
+            road_segment_id=segment_id,
+            resolution=source,
+            bucket__gte=floor_time(start, resolution),
+            bucket__lt=end,
+        )
+        .order_by("bucket")
+        .values_list(
+            "bucket",
+            "count",
+            "speed_sum",
+            "speed_min",
+            "speed_max",
+            "last_speed",
+            "last_at",
+        )
+    )
+
+    buckets = {}
+    for bucket, count, total, low, high, last_speed, last_at in rollups:
+        key = floor_time(bucket, resolution)
+        current = buckets.get(key)
+        if current is None:
+            buckets[key] = [count, total, low, high, last_speed, last_at]
+            continue
+        current[0] += count
+        current[1] += total
+        current[2] = min(current[2], low)
+        current[3] = max(current[3], high)
+        if last_at >= current[5]:
+            current[4], current[5] = last_speed, last_at
+
+    label = {seconds: name for name, seconds in SpeedRollup.RESOLUTIONS.items()}
+    return label[source], [
+        {
+            "bucket": bucket,
+            "count": count,
+            "avg_speed": total / count,
+            "min_speed": low,
+            "max_speed": high,
+            "last_speed": last_speed,
+        }
+        for bucket, (count, total, low, high, last_speed, _) in buckets.items()
+    ]
+
+
+def traffic_volume(resolution, start, end, road_segment_id=None, sensor_id=None):
+    """
+    Vehicle count and estimated distinct cars per ``resolution`` seconds
+    bucket for a segment and/or sensor, merged from the stored volume buckets.
+    Past the retention of the 15 minute buckets only daily ones are left, so
+    each bucket reports its actual width in ``resolution``.
+    """
+    volumes = TrafficVolume.objects.filter(
+        bucket__gte=floor_time(start, resolution), bucket__lt=end
+    )
+    if road_segment_id is not None:
+        volumes = volumes.filter(road_segment_id=road_segment_id)
+    if sensor_id is not None:
+        volumes = volumes.filter(sensor_id=sensor_id)
+
+    buckets = {}
+    for bucket, stored, count, cars in volumes.order_by("bucket").values_list(
+        "bucket", "resolution", "count", "cars"
+    ):
+        width = max(resolution, stored)
+        key = (floor_time(bucket, width), width)
+        current = buckets.get(key)
+        if current is None:
+            current = buckets[key] = [0, HyperLogLog()]
+        current[0] += count
+        current[1].merge(HyperLogLog(cars))
+
+    return [
+        {
+            "bucket": bucket,
+            "resolution": width,
+            "count": count,
+            "distinct_cars": sketch.count(),
+        }
+        for (bucket, width), (count, sketch) in sorted(buckets.items())
+    ]
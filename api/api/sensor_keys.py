@@ -0,0 +1,103 @@
+import hmac
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Sensor
+
+KEYS_VERSION_KEY = "sensor-keys-version"
+
+# Sensor a request authenticated as, both fields are None for the global key
+SensorKey = namedtuple("SensorKey", ["id", "uuid"])
+GLOBAL_KEY = SensorKey(None, None)
+
+
+class VerifiedKeyCache:
+    """
+    Process-local LRU of recently verified key digests, each stored with the
+    keys version it was verified at and kept for at most ``max_age`` seconds.
+    """
+
+    def __init__(self, max_size, max_age):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest, version):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None or entry[1] != version or entry[2] <= time.monotonic():
+                self.misses += 1
+                return None
+            self.entries.move_to_end(digest)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, digest, sensor, version):
+        with self.lock:
+            expires_at = time.monotonic() + self.max_age
+            self.entries[digest] = (sensor, version, expires_at)
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+verified_keys = VerifiedKeyCache(
+    settings.SENSOR_KEY_CACHE_SIZE, settings.SENSOR_KEY_CACHE_MAX_AGE
+)
+
+
+def keys_version():
+    # Seeded from the clock so an evicted version is never reused
+    return cache.get_or_set(KEYS_VERSION_KEY, time.time_ns, None)
+
+
+def verify_api_key(api_key):
+    """
+    Return the ``SensorKey`` an API key belongs to, ``GLOBAL_KEY`` for the
+    shared ``API_KEY_SENSOR`` or None when the key is not valid.
+    """
+    if not api_key:
+        return None
+    # The most common key, checked without the cache or the database
+    if settings.API_KEY_SENSOR and hmac.compare_digest(
+        api_key, settings.API_KEY_SENSOR
+    ):
+        return GLOBAL_KEY
+
+    digest = Sensor.hash_api_key(api_key)
+    version = keys_version()
+    sensor = verified_keys.get(digest, version)
+    if sensor is not None:
+        return sensor
+
+    row = Sensor.objects.filter(api_key_hash=digest).values_list("id", "uuid").first()
+    if row is not None:
+        sensor = SensorKey(*row)
+        verified_keys.set(digest, sensor, version)
+        return sensor
+    return None
+
+
+def invalidate_keys():
+    verified_keys.clear()
+    cache.set(KEYS_VERSION_KEY, time.time_ns(), None)
+
+
+# Issued, revoked or deleted keys stop verifying in every process at once
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+def sensor_changed_keys(sender, **kwargs):
+    invalidate_keys()
+    transaction.on_commit(invalidate_keys)
@@ -1,4 +1,7 @@
 from rest_framework import serializers
+from .cars import car_ids
+from .ingest import insert_checked
+from .lookups import ingest_lookups
 from .models import (
     RoadSegment,
     SpeedReading,
@@ -10,33 +13,22 @@ from .models import (
 
 
 class RoadSegmentSerializer(serializers.ModelSerializer):
-    current_speed = serializers.SerializerMethodField()
-    traffic_intensity = serializers.SerializerMethodField()
-    readings_count = serializers.SerializerMethodField()
-    updated_at = serializers.SerializerMethodField()
+    current_speed = serializers.FloatField(read_only=True)
+    traffic_intensity = serializers.CharField(read_only=True)
+    readings_count = serializers.IntegerField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
 
     class Meta:
         model = RoadSegment
-        fields = "__all__"
-        extra_fields = [
-            "current_speed",
-            "traffic_intensity",
-            "readings_count",
-            "updated_at",
+        # Latest reading state is exposed through the fields above
+        exclude = [
+            "geom",
+            "latest_speed",
+            "latest_reading_at",
+            "intensity",
+            "modified_at",
         ]
 
-    def get_current_speed(self, obj):
-        return obj.current_speed
-
-    def get_traffic_intensity(self, obj):
-        return obj.traffic_intensity
-
-    def get_readings_count(self, obj):
-        return obj.readings.count()
-
-    def get_updated_at(self, obj):
-        return obj.updated_at
-
 
 class SpeedReadingSerializer(serializers.ModelSerializer):
     traffic_intensity = serializers.ReadOnlyField()
@@ -44,6 +36,7 @@ class SpeedReadingSerializer(serializers.ModelSerializer):
     class Meta:
         model = SpeedReading
         fields = "__all__"
+        read_only_fields = ["created_at"]
 
 
 class TrafficIntensityThresholdSerializer(serializers.ModelSerializer):
@@ -61,17 +54,40 @@ class CarSerializer(serializers.ModelSerializer):
 class SensorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Sensor
-        fields = "__all__"
+        exclude = ["api_key_hash"]
+
+
+class RoadSegmentIdField(serializers.IntegerField):
+    # Validated against the in-process lookups instead of a query
+    default_error_messages = {
+        "does_not_exist": 'Invalid pk "{pk_value}" - object does not exist.'
+    }
+
+    def to_internal_value(self, data):
+        pk = super().to_internal_value(data)
+        if not ingest_lookups.segments([pk]):
+            self.fail("does_not_exist", pk_value=pk)
+        return pk
+
+
+class SensorUUIDField(serializers.UUIDField):
+    # Resolves to the sensor id through the in-process lookups
+    default_error_messages = {
+        "does_not_exist": "Object with uuid={value} does not exist."
+    }
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        sensor_ids = ingest_lookups.sensors([value])
+        if not sensor_ids:
+            self.fail("does_not_exist", value=value)
+        return sensor_ids[value]
 
 
 class TrafficObservationSerializer(serializers.ModelSerializer):
-    road_segment = serializers.PrimaryKeyRelatedField(
-        queryset=RoadSegment.objects.all()
-    )
-    license_plate = serializers.CharField(write_only=True)
-    sensor_uuid = serializers.SlugRelatedField(
-        queryset=Sensor.objects.all(), slug_field="uuid", write_only=True
-    )
+    road_segment = RoadSegmentIdField(source="road_segment_id")
+    license_plate = serializers.CharField(max_length=20, write_only=True)
+    sensor_uuid = SensorUUIDField(source="sensor_id", write_only=True)
 
     # Get car and sensor details
     car = serializers.SerializerMethodField()
@@ -106,10 +122,9 @@ class TrafficObservationSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         license_plate = validated_data.pop("license_plate")
-        sensor = validated_data.pop("sensor_uuid")
 
-        car, carCreated = Car.objects.get_or_create(license_plate=license_plate)
+        def insert():
+            car_id = car_ids([license_plate])[license_plate]
+            return TrafficObservation.objects.create(car_id=car_id, **validated_data)
 
-        return TrafficObservation.objects.create(
-            car=car, sensor=sensor, **validated_data
-        )
+        return insert_checked(insert)
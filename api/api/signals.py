@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent once per batch after the latest reading state of segments changed,
+# with the ids of the affected segments as ``segment_ids`` and the intensity
+# labels they had before or have after as ``intensities``
+readings_changed = Signal()
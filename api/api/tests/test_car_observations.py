@@ -5,12 +5,15 @@ from django.contrib.auth.models import User
 from ..models import RoadSegment, Sensor, Car, TrafficObservation
 from django.contrib.gis.geos import Point
 from django.utils import timezone
+from django.core.cache import cache
 from datetime import timedelta
 import uuid
 
 
 class CarLast24hObservationsTests(APITestCase):
     def setUp(self):
+        cache.clear()
+
         # Admin
         self.admin = User.objects.create_superuser(
             username="admin", password="admin", email="admin@admin.com"
@@ -102,3 +105,17 @@ class CarLast24hObservationsTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertIn("error", response.data)
         self.assertEqual(response.data["error"], "Car not found")
+
+    # Last 24h observations are built with a constant number of queries
+    def test_get_last_24h_observations_query_count(self):
+        url = reverse("car-last-24h-observations")
+        params = {"license_plate": "AA16AA"}
+
+        with self.assertNumQueries(2):  # Car and observations
+            response = self.client.get(url, params)
+        self.assertEqual(len(response.data["observations"]), 2)
+
+        # Served from cache afterwards
+        with self.assertNumQueries(0):
+            response = self.client.get(url, params)
+        self.assertEqual(len(response.data["observations"]), 2)
@@ -0,0 +1,51 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..models import RoadSegment, SpeedReading
+
+HEADER = "ID,Long_start,Lat_start,Long_end,Lat_end,Length,Speed\n"
+
+
+class CSVUploadTests(APITestCase):
+    def setUp(self):
+        # Admin
+        self.admin = User.objects.create_superuser(
+            username="admin", password="admin", email="admin@admin.com"
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def upload(self, content):
+        csv_file = SimpleUploadedFile("segments.csv", content.encode("utf-8"))
+        return self.client.post(
+            reverse("upload_csv"), {"csv_file": csv_file}, format="multipart"
+        )
+
+    # Upload segments with their initial speed reading
+    def test_upload_csv(self):
+        response = self.upload(
+            HEADER
+            + "1,103.94,30.75,103.95,30.74,1179.2,31.7\n"
+            + "2,103.94,30.75,103.93,30.75,620.9,49.4\n"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(RoadSegment.objects.count(), 2)
+        self.assertEqual(SpeedReading.objects.count(), 2)
+
+        segment = RoadSegment.objects.get(length=620.9)
+        self.assertEqual(segment.current_speed, 49.4)
+        self.assertEqual(segment.readings_count, 1)
+
+    # A bad row reports every error and stores nothing
+    def test_upload_csv_with_invalid_rows(self):
+        response = self.upload(
+            HEADER
+            + "1,103.94,30.75,103.95,30.74,1179.2,31.7\n"
+            + "2,103.94,invalid,103.93,30.75,620.9,49.4\n"
+            + "3,103.94,30.75\n"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([row["line"] for row in response.json()["rows"]], [3, 4])
+        self.assertEqual(RoadSegment.objects.count(), 0)
+        self.assertEqual(SpeedReading.objects.count(), 0)
@@ -0,0 +1,95 @@
+from django.test import TransactionTestCase
+from django.db import connection
+from django.utils import timezone
+from ..models import (
+    RoadSegment,
+    SpeedReading,
+    TrafficIntensityThreshold,
+    Sensor,
+    Car,
+    TrafficObservation,
+)
+from django.contrib.gis.geos import Point
+from datetime import timedelta
+import uuid
+
+
+# Runs outside a transaction so the tables can be vacuumed and analyzed
+class QueryPlanTests(TransactionTestCase):
+    def setUp(self):
+        now = timezone.now()
+
+        self.segments = RoadSegment.objects.bulk_create(
+            [
+                RoadSegment(start_point=Point(i, i), end_point=Point(i + 1, i + 1))
+                for i in range(200)
+            ]
+        )
+        self.sensor = Sensor.objects.create(name="Sensor 1", uuid=uuid.uuid4())
+        self.cars = Car.objects.bulk_create(
+            [Car(license_plate=f"AA{i:04d}") for i in range(200)]
+        )
+
+        SpeedReading.objects.bulk_create(
+            [
+                SpeedReading(road_segment=segment, speed=float(i % 80))
+                for segment in self.segments
+                for i in range(100)
+            ]
+        )
+        TrafficObservation.objects.bulk_create(
+            [
+                TrafficObservation(
+                    road_segment=self.segments[i % 200],
+                    car=car,
+                    sensor=self.sensor,
+                    timestamp=now - timedelta(minutes=i * 30),
+                )
+                for car in self.cars
+                for i in range(100)
+            ]
+        )
+        TrafficIntensityThreshold.objects.bulk_create(
+            [TrafficIntensityThreshold() for _ in range(5000)]
+        )
+
+        with connection.cursor() as cursor:
+            for model in [SpeedReading, TrafficObservation, TrafficIntensityThreshold]:
+                cursor.execute(f"VACUUM ANALYZE {model._meta.db_table}")
+
+    # Latest reading of a segment
+    def test_latest_reading_plan(self):
+        plan = (
+            SpeedReading.objects.filter(road_segment=self.segments[0])
+            .order_by("-created_at", "-id")
+            .values("speed", "created_at")[:1]
+            .explain()
+        )
+        self.assertIn("Index Only Scan using speedreading_segment_idx", plan)
+
+    # Observations of a car in the last 24h
+    def test_car_observations_plan(self):
+        plan = (
+            TrafficObservation.objects.filter(
+                car=self.cars[0], timestamp__gte=timezone.now() - timedelta(hours=24)
+            )
+            .order_by("-timestamp")
+            .values("timestamp", "road_segment_id", "sensor_id")
+            .explain()
+        )
+        self.assertIn("Index Only Scan using observation_car_idx", plan)
+
+    # Observations of a segment, newest first
+    def test_segment_observations_plan(self):
+        plan = (
+            TrafficObservation.objects.filter(road_segment=self.segments[0])
+            .order_by("-timestamp")
+            .values("timestamp")[:100]
+            .explain()
+        )
+        self.assertIn("observation_segment_idx", plan)
+
+    # Current threshold
+    def test_current_threshold_plan(self):
+        plan = TrafficIntensityThreshold.objects.order_by("-created_at")[:1].explain()
+        self.assertIn("threshold_created_idx", plan)
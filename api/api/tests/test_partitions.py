@@ -0,0 +1,98 @@
+import io
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from ..models import Car, RoadSegment, Sensor, SpeedReading, TrafficObservation
+from django.contrib.gis.geos import Point
+
+
+# DDL is transactional in Postgres, the test rollback undoes the partitioning
+class PartitionTests(TestCase):
+    def setUp(self):
+        old = timezone.now() - timedelta(days=200)
+        self.idle_segment = RoadSegment.objects.create(
+            start_point=Point(1.0, 1.0), end_point=Point(2.0, 2.0)
+        )
+        self.segment = RoadSegment.objects.create(
+            start_point=Point(3.0, 3.0), end_point=Point(4.0, 4.0)
+        )
+        SpeedReading.objects.bulk_create(
+            [
+                SpeedReading(
+                    road_segment=self.idle_segment, speed=10.0, created_at=old
+                ),
+                SpeedReading(
+                    road_segment=self.idle_segment,
+                    speed=15.0,
+                    created_at=old + timedelta(minutes=1),
+                ),
+                SpeedReading(road_segment=self.segment, speed=30.0, created_at=old),
+                SpeedReading(road_segment=self.segment, speed=40.0),
+            ]
+        )
+        TrafficObservation.objects.create(
+            road_segment=self.segment,
+            car=Car.objects.create(license_plate="AA16AA"),
+            sensor=Sensor.objects.create(name="Sensor 1", uuid=uuid.uuid4()),
+            timestamp=old,
+        )
+        # Fire the deferred foreign key checks, tables with pending trigger
+        # events cannot be altered
+        connection.check_constraints()
+
+    def partitions(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass",
+                [table],
+            )
+            return {name for (name,) in cursor.fetchall()}
+
+    # Tables are converted in place and upcoming partitions created
+    def test_convert_and_create_partitions(self):
+        call_command("manage_partitions", stdout=io.StringIO())
+
+        table = SpeedReading._meta.db_table
+        partitions = self.partitions(table)
+        next_week = timezone.now() + timedelta(days=7)
+        self.assertIn(f"{table}_legacy", partitions)
+        self.assertIn(f"{table}_default", partitions)
+        self.assertIn(f"{table}_p{next_week:%Y%m%d}", partitions)
+        self.assertEqual(SpeedReading.objects.count(), 4)
+        self.assertEqual(TrafficObservation.objects.count(), 1)
+
+        # New rows land in the partition of their day
+        SpeedReading.objects.create(road_segment=self.segment, speed=50.0)
+        self.assertEqual(SpeedReading.objects.count(), 5)
+
+        # A second run changes nothing
+        call_command("manage_partitions", stdout=io.StringIO())
+        self.assertEqual(self.partitions(table), partitions)
+
+    # Expired partitions are dropped, the latest reading of every segment kept
+    def test_expire_partitions_keeps_latest_readings(self):
+        call_command("manage_partitions", stdout=io.StringIO())
+        policy = dict(
+            settings.RETENTION_POLICY, speed_readings=-1, traffic_observations=-1
+        )
+        with override_settings(RETENTION_POLICY=policy):
+            call_command("apply_retention", stdout=io.StringIO())
+
+        table = SpeedReading._meta.db_table
+        self.assertNotIn(f"{table}_legacy", self.partitions(table))
+        self.assertEqual(
+            sorted(SpeedReading.objects.values_list("speed", flat=True)),
+            [15.0, 40.0],
+        )
+        self.assertEqual(TrafficObservation.objects.count(), 0)
+
+        for segment, speed in [(self.idle_segment, 15.0), (self.segment, 40.0)]:
+            segment.refresh_from_db()
+            self.assertEqual(segment.readings_count, 1)
+            self.assertEqual(segment.current_speed, speed)
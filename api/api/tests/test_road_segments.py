@@ -1,9 +1,31 @@
+import asyncio
+import io
+import json
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth.models import User
-from ..models import RoadSegment, SpeedReading, TrafficIntensityThreshold
+from ..models import RoadSegment, SpeedReading, TrafficIntensityThreshold, Version
 from django.contrib.gis.geos import Point
+from django.conf import settings
+from django.core.cache import cache
+from unittest import mock
+from asgiref.sync import sync_to_async
+from ..events import Broker, Subscription, broker, publish
+from ..serializers import RoadSegmentSerializer
+
+# A single test process shares its local memory, as a deployment must share
+# the response cache
+RESPONSE_CACHE = {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    "LOCATION": "test-responses",
+}
 
 
 class RoadSegmentTests(APITestCase):
@@ -52,14 +74,14 @@ class RoadSegmentTests(APITestCase):
         self.client.force_authenticate(user=self.admin)
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     # Get list of road segments by anonymous user
     def test_list_road_segments_unauthenticated(self):
         url = reverse("road-segment-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     # Update a road segment by admin
     def test_update_road_segment_admin(self):
@@ -159,17 +181,441 @@ class RoadSegmentTests(APITestCase):
         # Test low intensity filter
         url = reverse("road-segment-list") + "?intensity=low"
         response = self.client.get(url)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], segment_low.id)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["id"], segment_low.id)
 
         # Test medium intensity filter
         url = reverse("road-segment-list") + "?intensity=medium"
         response = self.client.get(url)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], segment_medium.id)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["id"], segment_medium.id)
 
         # Test high intensity filter
         url = reverse("road-segment-list") + "?intensity=high"
         response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["id"], segment_high.id)
+
+    # Bulk created readings update the latest reading state
+    def test_road_segment_bulk_readings(self):
+        SpeedReading.objects.bulk_create(
+            [
+                SpeedReading(road_segment=self.segment, speed=60.0),
+                SpeedReading(road_segment=self.segment, speed=10.0),
+            ]
+        )
+
+        self.segment.refresh_from_db()
+        self.assertEqual(self.segment.readings_count, 2)
+        self.assertEqual(self.segment.current_speed, 10.0)
+        self.assertEqual(self.segment.traffic_intensity, "high")
+
+    # List road segments with a constant number of queries
+    def test_list_road_segments_query_count(self):
+        for i in range(10):
+            segment = RoadSegment.objects.create(
+                start_point=Point(i, i), end_point=Point(i + 1, i + 1)
+            )
+            SpeedReading.objects.create(road_segment=segment, speed=30.0)
+
+        url = reverse("road-segment-list")
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 11)
+
+    # Filter by traffic intensity without scanning segments in Python
+    def test_filter_by_traffic_intensity_query_count(self):
+        for speed in [10.0, 30.0, 60.0, 70.0]:
+            segment = RoadSegment.objects.create(
+                start_point=Point(speed, speed), end_point=Point(speed, speed + 1)
+            )
+            SpeedReading.objects.create(road_segment=segment, speed=speed)
+
+        url = reverse("road-segment-list") + "?intensity=low"
+        with self.assertNumQueries(1):  # Threshold read by the same query
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    # Page through road segments with a cursor
+    def test_list_road_segments_cursor_pagination(self):
+        RoadSegment.objects.create(
+            start_point=Point(3.0, 3.0), end_point=Point(4.0, 4.0), length=1500.0
+        )
+
+        url = reverse("road-segment-list") + "?page_size=1"
+        response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["id"], self.segment.id)
+        self.assertIsNone(response.data["next"])
+
+    # Rows sharing a creation time are paged by id, without an offset
+    def test_list_road_segments_cursor_pagination_ties(self):
+        for i in range(4):
+            RoadSegment.objects.create(
+                start_point=Point(i, i), end_point=Point(i + 1, i + 1)
+            )
+        RoadSegment.objects.update(created_at=self.segment.created_at)
+        expected = list(
+            RoadSegment.objects.order_by("-id").values_list("id", flat=True)
+        )
+
+        url = reverse("road-segment-list") + "?page_size=2"
+        ids, urls = [], []
+        while url:
+            response = self.client.get(url)
+            ids += [segment["id"] for segment in response.data["results"]]
+            url = response.data["next"]
+            urls.append(url)
+        self.assertEqual(ids, expected)
+
+        # Back from the last page, through the same rows
+        response = self.client.get(urls[-2])
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(
+            [segment["id"] for segment in response.data["results"]], expected[2:4]
+        )
+
+    # Stream road segments as NDJSON
+    def test_list_road_segments_ndjson_stream(self):
+        url = reverse("road-segment-list") + "?stream=ndjson"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["id"], self.segment.id)
+
+    # Filter segments by bounding box and distance
+    def test_spatial_filters(self):
+        far_segment = RoadSegment.objects.create(
+            start_point=Point(30.0, 30.0), end_point=Point(31.0, 31.0)
+        )
+
+        url = reverse("road-segment-list") + "?bbox=0,0,3,3"
+        response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["id"], self.segment.id)
+
+        url = reverse("road-segment-list") + "?near=30.5,30.5&radius=1000"
+        response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["id"], far_segment.id)
+
+        # Malformed, non-finite, out of range or empty areas are rejected
+        for query in [
+            "bbox=0,0,3",
+            "bbox=0,0,nan,3",
+            "bbox=0,0,500,500",
+            "bbox=3,3,0,0",
+            "near=200,95",
+            "near=inf,0",
+            "near=0,0&radius=0",
+            "near=0,0&radius=nan",
+        ]:
+            response = self.client.get(reverse("road-segment-list") + "?" + query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+        url = reverse("road-segment-nearest") + "?near=-181,0"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Get the nearest segments to a point
+    def test_nearest_segments(self):
+        far_segment = RoadSegment.objects.create(
+            start_point=Point(30.0, 30.0), end_point=Point(31.0, 31.0)
+        )
+
+        url = reverse("road-segment-nearest") + "?near=29.0,29.0&k=1"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], segment_high.id)
+        self.assertEqual(response.data[0]["id"], far_segment.id)
+
+        # k is a whole number
+        response = self.client.get(reverse("road-segment-nearest") + "?near=1,1&k=0.5")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Get a vector tile with ETag validation
+    def test_road_segment_tile(self):
+        cache.clear()
+        url = reverse("road-segment-tile", args=[0, 0, 0])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/vnd.mapbox-vector-tile")
+        etag = response["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # New readings invalidate the cached tile
+        with self.captureOnCommitCallbacks(execute=True):
+            SpeedReading.objects.create(road_segment=self.segment, speed=10.0)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    # Tile ETags follow the segments in the tile, whoever wrote them
+    def test_road_segment_tile_etag(self):
+        url = reverse("road-segment-tile", args=[0, 0, 0])
+        etag = self.client.get(url)["ETag"]
+
+        # No signals, as for a write of another process
+        RoadSegment.objects.filter(pk=self.segment.pk).update(
+            latest_speed=10.0, intensity="high", modified_at=timezone.now()
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # Tiles elsewhere are untouched
+        url = reverse("road-segment-tile", args=[1, 0, 0])
+        etag = self.client.get(url)["ETag"]
+        RoadSegment.objects.update(modified_at=timezone.now())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    # Async endpoints return the same payload as the sync ones
+    def test_async_road_segment_endpoints(self):
+        SpeedReading.objects.create(road_segment=self.segment, speed=30.0)
+
+        response = self.client.get(reverse("road-segment-list"))
+        sync_results = response.json()["results"]
+
+        response = self.client.get(reverse("async-road-segment-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"], sync_results)
+
+        url = reverse("async-road-segment-detail", args=[self.segment.id])
+        response = self.client.get(url)
+        self.assertEqual(response.json(), sync_results[0])
+
+        url = reverse("async-road-segment-list") + "?intensity=medium"
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    # Speed history is served from the rollup buckets
+    def test_road_segment_history(self):
+        SpeedReading.objects.bulk_create(
+            [
+                SpeedReading(road_segment=self.segment, speed=speed)
+                for speed in [10.0, 20.0, 60.0]
+            ]
+        )
+        SpeedReading.objects.create(road_segment=self.segment, speed=30.0)
+
+        url = reverse("road-segment-history", args=[self.segment.id])
+        response = self.client.get(url, {"resolution": "2h"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["source_resolution"], "1h")
+
+        buckets = response.data["buckets"]
+        self.assertEqual(sum(bucket["count"] for bucket in buckets), 4)
+        self.assertEqual(min(bucket["min_speed"] for bucket in buckets), 10.0)
+        self.assertEqual(max(bucket["max_speed"] for bucket in buckets), 60.0)
+        self.assertEqual(buckets[-1]["last_speed"], 30.0)
+
+        response = self.client.get(url, {"resolution": "7s"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Pushed events only reach matching subscribers and only on changes
+    def test_road_segment_events_dispatch(self):
+        event = {
+            "id": self.segment.id,
+            "current_speed": 40.0,
+            "traffic_intensity": "medium",
+            "updated_at": None,
+            "bbox": [1.0, 1.0, 2.0, 2.0],
+        }
+
+        async def dispatch():
+            broker = Broker()
+            by_id = Subscription(segment_ids={self.segment.id})
+            inside = Subscription(bbox=[0.0, 0.0, 1.5, 1.5])
+            outside = Subscription(bbox=[5.0, 5.0, 6.0, 6.0])
+            broker.subscriptions.update([by_id, inside, outside])
+
+            broker.dispatch([event, dict(event)])
+            broker.dispatch([dict(event, current_speed=10.0, traffic_intensity="high")])
+            await asyncio.sleep(0)
+            return [s.queue.qsize() for s in [by_id, inside, outside]]
+
+        self.assertEqual(asyncio.run(dispatch()), [2, 2, 0])
+
+    # The events endpoint streams matching changes and resyncs slow clients
+    async def test_road_segment_events_stream(self):
+        url = reverse("async-road-segment-events") + f"?segments={self.segment.id}"
+        event = {
+            "id": self.segment.id,
+            "current_speed": 77.5,
+            "traffic_intensity": "low",
+            "updated_at": None,
+            "bbox": [1.0, 1.0, 2.0, 2.0],
+        }
+
+        # Streams are never served by WSGI workers
+        response = await sync_to_async(self.client.get)(url)
+        self.assertEqual(response.status_code, 501)
+
+        # No database listener, events are dispatched by hand
+        with mock.patch.object(broker, "listen", lambda: None):
+            response = await self.async_client.get(url)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            chunks = aiter(response.streaming_content)
+            self.assertEqual(await anext(chunks), b"retry: 5000\n\n")
+
+            broker.dispatch([event])
+            chunk = await anext(chunks)
+            self.assertTrue(chunk.startswith(b"event: segment\n"))
+            self.assertEqual(
+                json.loads(chunk.split(b"data: ")[1])["current_speed"], 77.5
+            )
+
+            (subscription,) = broker.subscriptions
+            for speed in range(subscription.queue.maxsize + 1):
+                subscription.put(dict(event, current_speed=float(speed)))
+            self.assertEqual(await anext(chunks), b"event: resync\ndata: {}\n\n")
+            await chunks.aclose()
+        self.assertEqual(broker.subscriptions, set())
+
+    # Segment events are only read and sent when a process listens
+    def test_publish_segment_events(self):
+        SpeedReading.objects.create(road_segment=self.segment, speed=30.0)
+        with self.assertNumQueries(1):
+            publish([self.segment.id])
+
+        with mock.patch("api.events.listening", Q):
+            with CaptureQueriesContext(connection) as queries:
+                publish([self.segment.id])
+        self.assertEqual(len(queries), 2)
+        self.assertIn("pg_notify", queries[1]["sql"])
+        self.assertIn('"current_speed": 30.0', queries[1]["sql"])
+        self.assertIn('"bbox": [1.0, 1.0, 2.0, 2.0]', queries[1]["sql"])
+
+    # Unchanged segments answer conditional requests with 304
+    def test_road_segment_conditional_get(self):
+        url = reverse("road-segment-detail", args=[self.segment.id])
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        SpeedReading.objects.create(road_segment=self.segment, speed=30.0)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    # Lists follow the network-wide version
+    def test_road_segment_list_conditional_get(self):
+        url = reverse("road-segment-list")
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(1):  # The version
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SpeedReading.objects.create(road_segment=self.segment, speed=30.0)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # The version is read from the database, bumps of other processes
+        # and deletions change it too
+        self.client.force_authenticate(user=self.admin)
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        Version.objects.bump(Version.SEGMENTS)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        RoadSegment.objects.create(start_point=Point(5, 5), end_point=Point(6, 6))
+        etag = self.client.get(url)["ETag"]
+        self.segment.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    # Anonymous lists are cached and only the affected groups are dropped
+    @override_settings(CACHES={**settings.CACHES, "responses": RESPONSE_CACHE})
+    def test_road_segment_list_response_cache(self):
+        low_url = reverse("road-segment-list") + "?intensity=low"
+        high_url = reverse("road-segment-list") + "?intensity=high"
+        for url in [low_url, high_url]:
+            self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+            self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        # The segment enters the low list, the high list is untouched
+        SpeedReading.objects.create(road_segment=self.segment, speed=60.0)
+        response = self.client.get(low_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(self.client.get(high_url)["X-Cache"], "HIT")
+
+        # Cached validators answer conditional requests without queries
+        etag = self.client.get(high_url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(high_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Authenticated requests bypass the cache, however they authenticate
+        self.client.force_authenticate(user=self.admin)
+        self.assertNotIn("X-Cache", self.client.get(low_url))
+        self.client.force_authenticate(user=None)
+        self.client.login(username="admin", password="admin")
+        self.assertNotIn("X-Cache", self.client.get(low_url))
+
+    # Fast list serializer matches the model serializer, listed and streamed
+    def test_road_segment_fast_list_matches_serializer(self):
+        SpeedReading.objects.create(road_segment=self.segment, speed=35.5)
+        RoadSegment.objects.create(
+            start_point=Point(-8.61, 41.15), end_point=Point(-8.6, 41.16), length=5.5
+        )
+        expected = RoadSegmentSerializer(
+            RoadSegment.objects.order_by("-created_at", "-id"), many=True
+        ).data
+
+        response = self.client.get(reverse("road-segment-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)["results"], expected)
+
+        response = self.client.get(reverse("road-segment-list") + "?stream=ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+    # Denormalized reading state is rebuilt from the readings
+    def test_refresh_segments_command(self):
+        SpeedReading.objects.create(road_segment=self.segment, speed=10.0)
+        SpeedReading.objects.create(road_segment=self.segment, speed=60.0)
+        RoadSegment.objects.update(
+            readings_count=0, latest_speed=None, latest_reading_at=None
+        )
+
+        call_command("refresh_segments", stdout=io.StringIO())
+
+        self.segment.refresh_from_db()
+        self.assertEqual(self.segment.readings_count, 2)
+        self.assertEqual(self.segment.current_speed, 60.0)
+        self.assertEqual(self.segment.traffic_intensity, "low")
+
+    # Segments without geometry are backfilled and found spatially again
+    def test_refresh_segments_backfills_geom(self):
+        RoadSegment.objects.update(geom=None)
+        self.assertFalse(RoadSegment.objects.in_bbox(0.5, 0.5, 2.5, 2.5).exists())
+
+        call_command("refresh_segments", stdout=io.StringIO())
+        self.assertTrue(RoadSegment.objects.in_bbox(0.5, 0.5, 2.5, 2.5).exists())
+
+    # Moving a point with update_fields moves the geometry too
+    def test_save_update_fields_refreshes_geom(self):
+        self.segment.end_point = Point(9.0, 9.0)
+        self.segment.save(update_fields=["end_point"])
+        self.assertTrue(RoadSegment.objects.in_bbox(8.5, 8.5, 9.5, 9.5).exists())
@@ -0,0 +1,143 @@
+import io
+import json
+from datetime import timedelta
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth.models import User
+from ..models import RoadSegment, SpeedReading, SpeedRollup
+from django.contrib.gis.geos import Point
+
+
+class SpeedReadingBulkTests(APITestCase):
+    def setUp(self):
+        # Admin
+        self.admin = User.objects.create_superuser(
+            username="admin", password="admin", email="admin@admin.com"
+        )
+        self.client.force_authenticate(user=self.admin)
+
+        self.segment = RoadSegment.objects.create(
+            start_point=Point(1.0, 1.0), end_point=Point(2.0, 2.0), length=1000.0
+        )
+        self.url = reverse("speed-reading-bulk")
+
+    # JSON array, latest state refreshed once for the batch
+    def test_bulk_json(self):
+        rows = [
+            {
+                "road_segment": self.segment.id,
+                "speed": 30.0,
+                "created_at": "2026-01-01T10:00:00Z",
+            },
+            {
+                "road_segment": self.segment.id,
+                "speed": 60.0,
+                "created_at": "2026-01-01T10:01:00Z",
+            },
+            {"road_segment": 9999, "speed": 10.0},
+            {"road_segment": self.segment.id, "speed": "fast"},
+        ]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([r["index"] for r in response.data["rejected"]], [2, 3])
+
+        self.segment.refresh_from_db()
+        self.assertEqual(self.segment.readings_count, 2)
+        self.assertEqual(self.segment.current_speed, 60.0)
+        self.assertTrue(SpeedRollup.objects.filter(road_segment=self.segment).exists())
+
+    # NDJSON body
+    def test_bulk_ndjson(self):
+        body = "\n".join(
+            json.dumps({"road_segment": self.segment.id, "speed": speed})
+            for speed in [10.0, 20.0, 30.0]
+        )
+        response = self.client.post(self.url, body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(SpeedReading.objects.count(), 3)
+
+        response = self.client.post(
+            self.url, "{not json", content_type="application/x-ndjson"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Bodies that are not UTF-8
+        response = self.client.post(
+            self.url, b'{"speed": "\xff"}', content_type="application/x-ndjson"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # CSV body with a header row
+    def test_bulk_csv(self):
+        body = (
+            "road_segment,speed,created_at\n"
+            f"{self.segment.id},45.5,2026-01-01T10:00:00Z\n"
+            f"{self.segment.id},50.0,\n"
+        )
+        response = self.client.post(self.url, body, content_type="text/csv")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 2)
+
+        self.segment.refresh_from_db()
+        self.assertEqual(self.segment.current_speed, 50.0)
+
+    # Only admins can create readings
+    def test_bulk_unauthenticated(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.post(
+            self.url, [{"road_segment": self.segment.id, "speed": 1.0}], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RetentionTests(APITestCase):
+    def setUp(self):
+        self.segment = RoadSegment.objects.create(
+            start_point=Point(1.0, 1.0), end_point=Point(2.0, 2.0)
+        )
+        self.idle_segment = RoadSegment.objects.create(
+            start_point=Point(3.0, 3.0), end_point=Point(4.0, 4.0)
+        )
+        old = timezone.now() - timedelta(days=30)
+        SpeedReading.objects.bulk_create(
+            [
+                SpeedReading(road_segment=self.segment, speed=10.0, created_at=old),
+                SpeedReading(road_segment=self.segment, speed=20.0),
+                SpeedReading(
+                    road_segment=self.idle_segment, speed=30.0, created_at=old
+                ),
+                SpeedReading(
+                    road_segment=self.idle_segment,
+                    speed=40.0,
+                    created_at=old + timedelta(minutes=1),
+                ),
+            ]
+        )
+
+    # Raw readings past retention are purged, the latest per segment is kept
+    def test_purge_readings_keeps_latest(self):
+        call_command("apply_retention", stdout=io.StringIO())
+
+        self.assertEqual(
+            list(
+                SpeedReading.objects.order_by("speed").values_list("speed", flat=True)
+            ),
+            [20.0, 40.0],
+        )
+        self.idle_segment.refresh_from_db()
+        self.assertEqual(self.idle_segment.readings_count, 1)
+        self.assertEqual(self.idle_segment.current_speed, 40.0)
+
+        # Rollups of the purged readings are kept
+        self.assertEqual(
+            sum(
+                SpeedRollup.objects.filter(
+                    road_segment=self.segment, resolution=86400
+                ).values_list("count", flat=True)
+            ),
+            2,
+        )
@@ -0,0 +1,72 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth.models import User
+from ..models import RoadSegment, SpeedReading, TrafficIntensityThreshold
+from django.contrib.gis.geos import Point
+
+
+class TrafficIntensityThresholdTests(APITestCase):
+    def setUp(self):
+        # Admin
+        self.admin = User.objects.create_superuser(
+            username="admin", password="admin", email="admin@admin.com"
+        )
+
+        TrafficIntensityThreshold.objects.create(medium_min=20.0, medium_max=50.0)
+
+        self.segment = RoadSegment.objects.create(
+            start_point=Point(1.0, 1.0), end_point=Point(2.0, 2.0), length=1000.0
+        )
+        SpeedReading.objects.create(road_segment=self.segment, speed=40.0)
+
+    # The current threshold is served from cache
+    def test_current_threshold_cached(self):
+        TrafficIntensityThreshold.current()
+        with self.assertNumQueries(0):
+            threshold = TrafficIntensityThreshold.current()
+        self.assertEqual(threshold.medium_max, 50.0)
+
+    # Saving a new threshold invalidates the cache and reclassifies segments
+    def test_new_threshold_invalidates_cache(self):
+        self.segment.refresh_from_db()
+        self.assertEqual(self.segment.traffic_intensity, "medium")
+
+        url = reverse("threshold-list")
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(
+            url, {"medium_min": 10.0, "medium_max": 30.0}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(url)
+        self.assertEqual(response.data["medium_max"], 30.0)
+
+        self.segment.refresh_from_db()
+        self.assertEqual(self.segment.traffic_intensity, "low")
+
+    # Readings are labeled with the stored threshold, not a stale cached one
+    def test_refresh_intensity_ignores_stale_cache(self):
+        stale = TrafficIntensityThreshold.current()
+        TrafficIntensityThreshold.objects.create(medium_min=10.0, medium_max=30.0)
+        # Another process, its copy of the threshold is not dropped
+        TrafficIntensityThreshold._local_cache = (stale, float("inf"))
+        self.addCleanup(TrafficIntensityThreshold.invalidate_cache)
+
+        # High with the stale bounds, medium with the stored ones
+        SpeedReading.objects.create(road_segment=self.segment, speed=15.0)
+        self.segment.refresh_from_db()
+        self.assertEqual(self.segment.traffic_intensity, "medium")
+
+    # The current threshold answers conditional requests with 304
+    def test_current_threshold_conditional_get(self):
+        url = reverse("threshold-list")
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.force_authenticate(user=self.admin)
+        self.client.post(url, {"medium_min": 10.0, "medium_max": 30.0}, format="json")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -1,8 +1,26 @@
+import io
+from datetime import timedelta
+from unittest import mock
+from django.core.management import call_command
+from django.utils import timezone
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth.models import User
-from ..models import RoadSegment, Sensor, Car, TrafficObservation
+from ..models import (
+    RoadSegment,
+    Sensor,
+    Car,
+    TrafficObservation,
+    TrafficVolume,
+    IngestBatch,
+)
+from ..queue import process_batches
+from ..cars import car_ids, cars_version, plate_cache
+from ..lookups import ingest_lookups, lookups_version
+from ..sensor_keys import GLOBAL_KEY, verify_api_key
+from ..throttling import sensor_buckets
 from django.contrib.gis.geos import Point
 import uuid
 from django.conf import settings
@@ -129,3 +147,387 @@ class TrafficObservationTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(TrafficObservation.objects.count(), 0)
         self.assertEqual(Car.objects.count(), 0)
+
+    # Bulk create reports rejected rows by index
+    def test_create_bulk_traffic_observations_with_rejected_rows(self):
+        url = reverse("traffic-observation-list")
+        data = [
+            {
+                "road_segment": self.segment1.id,
+                "license_plate": "AA16AA",
+                "timestamp": "2023-05-29T09:27:26.769Z",
+                "sensor_uuid": str(self.sensor1.uuid),
+            },
+            {
+                "road_segment": 9999,  # Non-existent segment ID
+                "license_plate": "BB17BB",
+                "timestamp": "2025-04-07T17:05:21.713Z",
+                "sensor_uuid": str(self.sensor2.uuid),
+            },
+            {
+                "road_segment": self.segment2.id,
+                "license_plate": "AA16AA",
+                "timestamp": "not-a-date",
+                "sensor_uuid": str(self.sensor2.uuid),
+            },
+        ]
+
+        self.client.credentials(HTTP_X_API_KEY=self.valid_api_key)
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([row["index"] for row in response.data["rejected"]], [1, 2])
+        self.assertIn("road_segment", response.data["rejected"][0]["errors"])
+        self.assertIn("timestamp", response.data["rejected"][1]["errors"])
+
+        self.assertEqual(TrafficObservation.objects.count(), 1)
+        self.assertEqual(Car.objects.count(), 1)
+
+    # Booleans and fractional segment ids are rejected, not coerced
+    def test_create_traffic_observations_with_non_integer_segment(self):
+        url = reverse("traffic-observation-list")
+        data = [
+            {
+                "road_segment": value,
+                "license_plate": "AA16AA",
+                "timestamp": "2023-05-29T09:27:26.769Z",
+                "sensor_uuid": str(self.sensor1.uuid),
+            }
+            for value in [True, self.segment1.id + 0.9]
+        ]
+
+        self.client.credentials(HTTP_X_API_KEY=self.valid_api_key)
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["created"], 0)
+        for row in response.data["rejected"]:
+            self.assertIn("road_segment", row["errors"])
+        self.assertEqual(TrafficObservation.objects.count(), 0)
+
+    # Enqueue observations and ingest them once
+    def test_enqueue_traffic_observations(self):
+        url = reverse("traffic-observation-list")
+        data = [
+            {
+                "road_segment": self.segment1.id,
+                "license_plate": "AA16AA",
+                "timestamp": "2023-05-29T09:27:26.769Z",
+                "sensor_uuid": str(self.sensor1.uuid),
+            },
+            {
+                "road_segment": 9999,  # Non-existent segment ID
+                "license_plate": "BB17BB",
+                "timestamp": "2025-04-07T17:05:21.713Z",
+                "sensor_uuid": str(self.sensor2.uuid),
+            },
+        ]
+
+        self.client.credentials(HTTP_X_API_KEY=self.valid_api_key)
+        headers = {"HTTP_PREFER": "respond-async", "HTTP_IDEMPOTENCY_KEY": "batch-1"}
+        response = self.client.post(url, data, format="json", **headers)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "pending")
+        self.assertEqual(TrafficObservation.objects.count(), 0)
+
+        # Resubmitting the same key does not queue it again
+        response = self.client.post(url, data, format="json", **headers)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(IngestBatch.objects.count(), 1)
+
+        response = self.client.get(reverse("traffic-observation-queue"))
+        self.assertEqual(response.data["pending_rows"], 2)
+
+        self.assertEqual(process_batches(max_rows=1000), 1)
+        self.assertEqual(process_batches(max_rows=1000), 0)
+        self.assertEqual(TrafficObservation.objects.count(), 1)
+
+        response = self.client.get(
+            reverse("traffic-observation-queue"), {"idempotency_key": "batch-1"}
+        )
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual(response.data["result"]["created"], 1)
+        self.assertEqual(response.data["result"]["rejected"][0]["index"], 1)
+
+    # A failing batch is retried later on its own, the others are ingested
+    def test_enqueue_failing_batch_is_isolated(self):
+        poison = IngestBatch.objects.create(idempotency_key="poison", payload=5, size=1)
+        batch = IngestBatch.objects.create(
+            idempotency_key="batch-1",
+            payload=[
+                {
+                    "road_segment": self.segment1.id,
+                    "license_plate": "AA16AA",
+                    "timestamp": "2023-05-29T09:27:26.769Z",
+                    "sensor_uuid": str(self.sensor1.uuid),
+                }
+            ],
+            size=1,
+        )
+
+        self.assertEqual(process_batches(max_rows=1000), 2)
+        batch.refresh_from_db()
+        poison.refresh_from_db()
+        self.assertEqual(batch.status, IngestBatch.DONE)
+        self.assertEqual(TrafficObservation.objects.count(), 1)
+        self.assertEqual(poison.status, IngestBatch.PENDING)
+        self.assertEqual(poison.attempts, 1)
+        self.assertIn("error", poison.result)
+
+        # Not retried before its backoff
+        self.assertEqual(process_batches(max_rows=1000), 0)
+
+        with override_settings(INGEST_WORKER_MAX_ATTEMPTS=2):
+            IngestBatch.objects.filter(pk=poison.pk).update(
+                next_attempt_at=poison.created_at
+            )
+            self.assertEqual(process_batches(max_rows=1000), 1)
+        poison.refresh_from_db()
+        self.assertEqual(poison.status, IngestBatch.FAILED)
+
+    # Idempotency keys longer than the column are rejected
+    def test_enqueue_idempotency_key_too_long(self):
+        url = reverse("traffic-observation-list")
+        data = {
+            "road_segment": self.segment1.id,
+            "license_plate": "AA16AA",
+            "timestamp": "2023-05-29T09:27:26.769Z",
+            "sensor_uuid": str(self.sensor1.uuid),
+        }
+
+        self.client.credentials(HTTP_X_API_KEY=self.valid_api_key)
+        headers = {"HTTP_PREFER": "respond-async", "HTTP_IDEMPOTENCY_KEY": "k" * 101}
+        response = self.client.post(url, data, format="json", **headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(IngestBatch.objects.count(), 0)
+
+    # Vehicle counts and distinct cars per bucket
+    def test_traffic_volume(self):
+        url = reverse("traffic-observation-list")
+        data = [
+            {
+                "road_segment": self.segment1.id,
+                "license_plate": license_plate,
+                "timestamp": timestamp,
+                "sensor_uuid": str(self.sensor1.uuid),
+            }
+            for license_plate, timestamp in [
+                ("AA16AA", "2025-04-07T17:05:00Z"),
+                ("AA16AA", "2025-04-07T17:20:00Z"),
+                ("BB17BB", "2025-04-07T17:35:00Z"),
+                ("CC18CC", "2025-04-07T18:05:00Z"),
+            ]
+        ]
+        self.client.credentials(HTTP_X_API_KEY=self.valid_api_key)
+        self.client.post(url, data, format="json")
+
+        url = reverse("traffic-observation-volume")
+        params = {
+            "road_segment": self.segment1.id,
+            "resolution": "1h",
+            "start": "2025-04-07T17:00:00Z",
+            "end": "2025-04-07T19:00:00Z",
+        }
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        buckets = response.data["buckets"]
+        self.assertEqual([bucket["count"] for bucket in buckets], [3, 1])
+        self.assertEqual([bucket["distinct_cars"] for bucket in buckets], [2, 1])
+
+        params = {"sensor_uuid": str(self.sensor2.uuid)}
+        response = self.client.get(url, params)
+        self.assertEqual(response.data["buckets"], [])
+
+        # Segment ids are integers, not truncated decimals
+        response = self.client.get(url, {"road_segment": f"{self.segment1.id}.7"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Volume past retention is compacted into daily buckets of that width
+    def test_traffic_volume_compaction(self):
+        day = (timezone.now() - timedelta(days=400)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        data = [
+            {
+                "road_segment": self.segment1.id,
+                "license_plate": license_plate,
+                "timestamp": (day + timedelta(hours=hours)).isoformat(),
+                "sensor_uuid": str(self.sensor1.uuid),
+            }
+            for license_plate, hours in [("AA16AA", 1), ("BB17BB", 9)]
+        ]
+        self.client.credentials(HTTP_X_API_KEY=self.valid_api_key)
+        self.client.post(reverse("traffic-observation-list"), data, format="json")
+
+        call_command("apply_retention", stdout=io.StringIO())
+        self.assertEqual(
+            list(TrafficVolume.objects.values_list("resolution", "bucket", "count")),
+            [(TrafficVolume.COMPACTED_RESOLUTION, day, 2)],
+        )
+
+        params = {
+            "road_segment": self.segment1.id,
+            "resolution": "15m",
+            "start": day.isoformat(),
+            "end": (day + timedelta(days=1)).isoformat(),
+        }
+        response = self.client.get(reverse("traffic-observation-volume"), params)
+        buckets = response.data["buckets"]
+        self.assertEqual(len(buckets), 1)
+        self.assertEqual(buckets[0]["resolution"], 86400)
+        self.assertEqual(buckets[0]["count"], 2)
+
+    # Per-sensor keys only submit their own observations, until revoked
+    def test_per_sensor_api_key(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(reverse("sensor-api-key", args=[self.sensor1.id]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        api_key = response.data["api_key"]
+        self.client.force_authenticate(user=None)
+
+        url = reverse("traffic-observation-list")
+        observation = {
+            "road_segment": self.segment1.id,
+            "license_plate": "AA16AA",
+            "timestamp": "2023-05-29T09:27:26.769Z",
+            "sensor_uuid": str(self.sensor1.uuid),
+        }
+        self.client.credentials(HTTP_X_API_KEY=api_key)
+        response = self.client.post(url, observation, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # Verified keys are served from the in-process cache
+        with self.assertNumQueries(0):
+            self.assertEqual(verify_api_key(api_key).uuid, self.sensor1.uuid)
+            self.assertEqual(verify_api_key(self.valid_api_key), GLOBAL_KEY)
+
+        response = self.client.post(
+            url, [dict(observation, sensor_uuid=str(self.sensor2.uuid))], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("sensor_uuid", response.data["rejected"][0]["errors"])
+
+        self.sensor1.revoke_api_key()
+        response = self.client.post(url, observation, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    # A sensor over its rate gets 429 with Retry-After
+    def test_sensor_rate_throttle(self):
+        url = reverse("traffic-observation-list")
+        observation = {
+            "road_segment": self.segment1.id,
+            "license_plate": "AA16AA",
+            "timestamp": "2023-05-29T09:27:26.769Z",
+            "sensor_uuid": str(self.sensor1.uuid),
+        }
+        self.client.credentials(HTTP_X_API_KEY=self.valid_api_key)
+        with mock.patch.multiple(sensor_buckets, rate=0.5, burst=1):
+            response = self.client.post(url, observation, format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+            response = self.client.post(url, observation, format="json")
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(response["Retry-After"], "2")
+
+    # Ingest is shed while the queue is backing up, reads are not
+    @override_settings(INGEST_SHED_QUEUE_ROWS=0)
+    def test_ingest_load_shedding(self):
+        url = reverse("traffic-observation-list")
+        self.client.credentials(HTTP_X_API_KEY=self.valid_api_key)
+        response = self.client.post(url, [], format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", response)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    # Foreign keys of ingested rows resolve from the in-process lookups
+    def test_ingest_lookups(self):
+        ingest_lookups.segments([self.segment1.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                ingest_lookups.segments([self.segment1.id, self.segment2.id]),
+                {self.segment1.id, self.segment2.id},
+            )
+            self.assertEqual(
+                ingest_lookups.sensors([self.sensor1.uuid]),
+                {self.sensor1.uuid: self.sensor1.id},
+            )
+
+        # Bulk created segments send no signal, a miss reloads them
+        segment = RoadSegment.objects.bulk_create(
+            [RoadSegment(start_point=Point(5.0, 5.0), end_point=Point(6.0, 6.0))]
+        )[0]
+        self.assertEqual(ingest_lookups.segments([segment.id, 9999]), {segment.id})
+
+        # Deletes are seen at once
+        self.sensor2.delete()
+        self.assertEqual(ingest_lookups.sensors([self.sensor2.uuid]), {})
+
+    # Ids deleted by another process fail the foreign key, then are rejected
+    def test_ingest_with_stale_lookups(self):
+        stale = ingest_lookups.snapshot()
+        RoadSegment.objects.filter(pk=self.segment2.id).delete()
+        # No signal reaches this process, its lookups still hold the segment
+        ingest_lookups.data = stale
+        ingest_lookups.version = lookups_version()
+
+        url = reverse("traffic-observation-list")
+        data = [
+            {
+                "road_segment": segment_id,
+                "license_plate": "AA16AA",
+                "timestamp": "2023-05-29T09:27:26.769Z",
+                "sensor_uuid": str(self.sensor1.uuid),
+            }
+            for segment_id in [self.segment1.id, self.segment2.id]
+        ]
+        self.client.credentials(HTTP_X_API_KEY=self.valid_api_key)
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["rejected"][0]["index"], 1)
+        self.assertEqual(TrafficObservation.objects.count(), 1)
+
+    # Repeat plates resolve from the plate cache without a query
+    def test_plate_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = car_ids(["AA16AA", "BB17BB"])
+        self.assertEqual(Car.objects.count(), 2)
+
+        hits = plate_cache.hits
+        with self.assertNumQueries(0):
+            self.assertEqual(car_ids(["AA16AA", "BB17BB"]), first)
+        self.assertEqual(plate_cache.hits, hits + 2)
+
+        # Deleted cars are not served from the cache
+        Car.objects.get(license_plate="AA16AA").delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            second = car_ids(["AA16AA"])
+        self.assertNotEqual(second["AA16AA"], first["AA16AA"])
+        self.assertEqual(Car.objects.count(), 2)
+
+    # Cars deleted by another process fail the foreign key, then are re-created
+    def test_ingest_with_stale_plate_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            stale = car_ids(["AA16AA"])
+        Car.objects.all().delete()
+        # No signal reaches this process, its cache still holds the car
+        plate_cache.set_many(stale, cars_version())
+
+        url = reverse("traffic-observation-list")
+        data = [
+            {
+                "road_segment": self.segment1.id,
+                "license_plate": "AA16AA",
+                "timestamp": "2023-05-29T09:27:26.769Z",
+                "sensor_uuid": str(self.sensor1.uuid),
+            }
+        ] * 2
+        self.client.credentials(HTTP_X_API_KEY=self.valid_api_key)
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 2)
+        car = Car.objects.get(license_plate="AA16AA")
+        self.assertNotEqual(car.id, stale["AA16AA"])
+        self.assertEqual(TrafficObservation.objects.filter(car=car).count(), 2)
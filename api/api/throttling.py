@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+from .queue import database_latency, pending_rows
+
+
+class TokenBuckets:
+    """
+    Token buckets refilled at ``rate`` tokens per second up to ``burst``,
+    kept in process memory for the most recently seen ``max_size`` keys.
+    With ``shared`` the bucket state lives in the default cache instead, so
+    every process draws from the same buckets (last write wins, a few extra
+    tokens can slip through under contention).
+    """
+
+    def __init__(self, rate, burst, max_size=10000, shared=False):
+        self.rate = rate
+        self.burst = burst
+        self.max_size = max_size
+        self.shared = shared
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, key, tokens):
+        """
+        Take ``tokens`` from the bucket of ``key``. Returns 0 when granted,
+        otherwise the seconds until enough tokens are available.
+        """
+        tokens = min(tokens, self.burst)  # Larger requests wait for a full bucket
+        with self.lock:
+            now = time.monotonic() if not self.shared else time.time()
+            available, updated = self.load(key, now)
+            available = min(self.burst, available + (now - updated) * self.rate)
+            if available >= tokens:
+                self.store(key, available - tokens, now)
+                return 0
+            self.store(key, available, now)
+            return (tokens - available) / self.rate
+
+    def load(self, key, now):
+        if self.shared:
+            return cache.get(f"throttle:{key}") or (self.burst, now)
+        return self.buckets.get(key) or (self.burst, now)
+
+    def store(self, key, available, now):
+        if self.shared:
+            # Expires once it would be full again anyway
+            timeout = int((self.burst - available) / self.rate) + 1
+            cache.set(f"throttle:{key}", (available, now), timeout)
+            return
+        self.buckets[key] = (available, now)
+        self.buckets.move_to_end(key)
+        while len(self.buckets) > self.max_size:
+            self.buckets.popitem(last=False)
+
+
+sensor_buckets = TokenBuckets(
+    settings.SENSOR_THROTTLE_RATE,
+    settings.SENSOR_THROTTLE_BURST,
+    shared=settings.SENSOR_THROTTLE_SHARED,
+)
+
+
+class SensorRateThrottle(BaseThrottle):
+    """
+    Ingest rate per sensor, one token per submitted observation. Sensors
+    with their own API key are identified by it, the global key by client
+    address. Runs after SensorAPIOnlyPermission has verified the key.
+    """
+
+    def allow_request(self, request, view):
+        if request.method != "POST":
+            return True
+
+        sensor = getattr(request, "sensor", None)
+        if sensor is not None and sensor.uuid is not None:
+            key = f"sensor:{sensor.uuid}"
+        else:
+            key = f"address:{self.get_ident(request)}"
+        rows = len(request.data) if isinstance(request.data, list) else 1
+
+        self.retry_after = sensor_buckets.take(key, rows)
+        return self.retry_after == 0
+
+    def wait(self):
+        return self.retry_after
+
+
+class IngestLoadShedThrottle(BaseThrottle):
+    """
+    Turns ingest away while the queue is backing up or the database is slow,
+    so reads keep their share of the database during floods.
+    """
+
+    def allow_request(self, request, view):
+        if request.method != "POST":
+            return True
+        return (
+            pending_rows() < settings.INGEST_SHED_QUEUE_ROWS
+            and database_latency() < settings.INGEST_SHED_DB_LATENCY
+        )
+
+    def wait(self):
+        return settings.INGEST_QUEUE_RETRY_AFTER
@@ -0,0 +1,64 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from .models import RoadSegment
+
+TILE_SQL = """
+WITH bounds AS (SELECT ST_TileEnvelope(%s, %s, %s) AS geom),
+tile AS (
+    SELECT
+        ST_AsMVTGeom(ST_Transform(s.geom::geometry, 3857), bounds.geom) AS geom,
+        s.id,
+        s.length,
+        s.latest_speed AS current_speed,
+        s.intensity AS traffic_intensity
+    FROM {table} s, bounds
+    WHERE s.geom && ST_Transform(bounds.geom, 4326)::geography
+)
+SELECT ST_AsMVT(tile.*, 'road_segments', 4096, 'geom') FROM tile
+"""
+
+# The segments a tile draws, as count, latest and summed modification times.
+# The count catches deletions, the sum rows changed below the latest one.
+TILE_STATE_SQL = """
+WITH bounds AS (SELECT ST_TileEnvelope(%s, %s, %s) AS geom)
+SELECT count(*), max(s.modified_at), sum(extract(epoch FROM s.modified_at))
+FROM {table} s, bounds
+WHERE s.geom && ST_Transform(bounds.geom, 4326)::geography
+"""
+
+
+def tile_etag(z, x, y):
+    """
+    ETag of a vector tile, read from the segments it covers so every process
+    agrees on it whatever cache backend they use, and writes made through
+    ``QuerySet.update()`` change it as well.
+    """
+    table = connection.ops.quote_name(RoadSegment._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(TILE_STATE_SQL.format(table=table), [z, x, y])
+        state = cursor.fetchone()
+    return f'"{hashlib.md5(repr(state).encode()).hexdigest()}"'
+
+
+def get_tile(z, x, y, etag):
+    """
+    Content of a vector tile, cached under its ``etag`` for the zoom levels in
+    ``TILE_CACHE_ZOOMS``. Changed tiles get new keys, the old ones expire.
+    """
+    cached = z in settings.TILE_CACHE_ZOOMS
+    if cached:
+        key = f"tile:{z}/{x}/{y}:{etag}"
+        content = cache.get(key)
+        if content is not None:
+            return content
+
+    table = connection.ops.quote_name(RoadSegment._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(TILE_SQL.format(table=table), [z, x, y])
+        content = bytes(cursor.fetchone()[0] or b"")
+
+    if cached:
+        cache.set(key, content, settings.TILE_CACHE_TIMEOUT)
+    return content
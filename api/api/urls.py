@@ -3,12 +3,14 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     CSVUploadView,
     RoadSegmentViewSet,
+    RoadSegmentTileView,
     SpeedReadingViewSet,
     TrafficIntensityThresholdViewSet,
     CarViewSet,
     SensorViewSet,
     TrafficObservationViewSet,
 )
+from . import async_views
 
 router = DefaultRouter()
 router.register(r"roadsegment", RoadSegmentViewSet, basename="road-segment")
@@ -22,5 +24,36 @@ router.register(
 
 urlpatterns = [
     path("upload-csv/", CSVUploadView.as_view(), name="upload_csv"),
+    path(
+        "roadsegment/tiles/<int:z>/<int:x>/<int:y>.mvt",
+        RoadSegmentTileView.as_view(),
+        name="road-segment-tile",
+    ),
+    # Async read endpoints for ASGI deployments
+    path(
+        "async/roadsegment/",
+        async_views.road_segment_list,
+        name="async-road-segment-list",
+    ),
+    path(
+        "async/roadsegment/<int:pk>/",
+        async_views.road_segment_detail,
+        name="async-road-segment-detail",
+    ),
+    path(
+        "async/roadsegment/events/",
+        async_views.road_segment_events,
+        name="async-road-segment-events",
+    ),
+    path(
+        "async/thresholds/",
+        async_views.threshold_current,
+        name="async-threshold",
+    ),
+    path(
+        "async/cars/last_24h_observations/",
+        async_views.car_last_24h_observations,
+        name="async-car-last-24h-observations",
+    ),
     path("", include(router.urls)),
 ]
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import RoadSegment, TrafficIntensityThreshold, Version
+from .signals import readings_changed
+
+
+# Reading, segment and threshold writes change the segment lists
+@receiver(readings_changed)
+@receiver(post_save, sender=RoadSegment)
+@receiver(post_delete, sender=RoadSegment)
+@receiver(post_save, sender=TrafficIntensityThreshold)
+@receiver(post_delete, sender=TrafficIntensityThreshold)
+def segments_changed_version(sender, **kwargs):
+    Version.objects.bump(Version.SEGMENTS)
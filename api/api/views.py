@@ -1,6 +1,9 @@
-import csv
+import io
+import math
+import uuid
+from functools import partial
 from rest_framework.views import APIView
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from .models import (
     RoadSegment,
     SpeedReading,
@@ -8,14 +11,21 @@ from .models import (
     Car,
     Sensor,
     TrafficObservation,
+    IngestBatch,
+    TrafficVolume,
+    Version,
 )
-from django.contrib.gis.geos import Point
 from rest_framework.response import Response
 from rest_framework import status, viewsets, permissions
+from django.conf import settings
+from django.core.cache import cache
 from django.http import JsonResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import timedelta
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from django.contrib.gis.geos import Point
 from rest_framework.response import Response
 from .serializers import (
     RoadSegmentSerializer,
@@ -26,10 +36,87 @@ from .serializers import (
     TrafficObservationSerializer,
 )
 from .permissions import IsAdminOrReadOnly, SensorAPIOnlyPermission
+from .throttling import IngestLoadShedThrottle, SensorRateThrottle
+from .pagination import TimestampCursorPagination
+from .mixins import (
+    ConditionalGetMixin,
+    FastListMixin,
+    NDJSONStreamMixin,
+    ResponseCacheMixin,
+)
+from .fast_serializers import (
+    RoadSegmentFastSerializer,
+    TrafficObservationFastSerializer,
+)
+from .cars import plate_cache
+from .ingest import ingest_observations, ingest_speed_readings
+from .parsers import CSVParser, NDJSONParser
+from .queue import QueueFull, enqueue, queue_metrics
+from .importers import import_road_segments
+from .renderers import MVTRenderer
+from .tiles import get_tile, tile_etag
+from .rollups import MAX_BUCKETS, parse_resolution, speed_history, traffic_volume
+from .payloads import car_observations, car_observations_payload
+from .response_cache import INTENSITIES, SEGMENTS, THRESHOLDS, intensity_group
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 
+def parse_coordinates(params, name, count):
+    # lon,lat pairs, finite and within the WGS 84 ranges PostGIS accepts
+    try:
+        values = [float(value) for value in params[name].split(",")]
+    except ValueError:
+        values = []
+    if len(values) != count or not all(map(math.isfinite, values)):
+        raise ValidationError({name: f"Expected {count} comma separated numbers"})
+    for lon, lat in zip(values[::2], values[1::2]):
+        if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+            raise ValidationError(
+                {name: "Longitude must be within [-180, 180], latitude [-90, 90]"}
+            )
+    return values
+
+
+def parse_bbox(params, name):
+    min_lon, min_lat, max_lon, max_lat = bbox = parse_coordinates(params, name, 4)
+    if min_lon >= max_lon or min_lat >= max_lat:
+        raise ValidationError({name: "Expected min_lon,min_lat,max_lon,max_lat"})
+    return bbox
+
+
+def parse_time(params, name, default):
+    if name not in params:
+        return default
+    try:
+        value = parse_datetime(params[name])
+    except ValueError:
+        value = None
+    if value is None:
+        raise ValidationError({name: "Expected an ISO 8601 datetime"})
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def parse_number(params, name, default, max_value):
+    try:
+        value = float(params.get(name, default))
+    except ValueError:
+        raise ValidationError({name: "Expected a number"})
+    if not 0 < value <= max_value:
+        raise ValidationError({name: f"Must be between 0 and {max_value}"})
+    return value
+
+
+def parse_integer(params, name, default, max_value):
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise ValidationError({name: "Expected an integer"})
+    if not 0 < value <= max_value:
+        raise ValidationError({name: f"Must be between 1 and {max_value}"})
+    return value
+
+
 class CSVUploadView(APIView):
     parser_classes = (MultiPartParser, FormParser)
     permission_classes = [IsAdminOrReadOnly]
@@ -42,42 +129,17 @@ class CSVUploadView(APIView):
         if not csv_file.name.endswith(".csv"):
             return JsonResponse({"error": "The file is not a CSV."}, status=400)
 
-        file_content = csv_file.read().decode("utf-8")
-        reader = csv.reader(file_content.splitlines())
-
-        next(reader)  # Skip header row
-
-        created_segments = []
-        for row in reader:
-            try:
-                id, start_lon, start_lat, end_lon, end_lat, length, speed = (
-                    row[0],
-                    row[1],
-                    row[2],
-                    row[3],
-                    row[4],
-                    row[5],
-                    row[6],
-                )
-
-                start_point = Point(float(start_lon), float(start_lat))
-                end_point = Point(float(end_lon), float(end_lat))
-
-                road_segment = RoadSegment.objects.create(
-                    start_point=start_point, end_point=end_point, length=length
-                )
-
-                SpeedReading.objects.create(
-                    road_segment=road_segment, speed=float(speed)
-                )
-
-                created_segments.append(road_segment.id)
-
-            except Exception as e:
-                return JsonResponse(
-                    {"error": f"Error while processing line {row}: {str(e)}"},
-                    status=400,
-                )
+        lines = io.TextIOWrapper(csv_file.file, encoding="utf-8", newline="")
+        try:
+            created_segments, errors = import_road_segments(lines)
+        except UnicodeDecodeError as e:
+            return JsonResponse({"error": f"Invalid file encoding: {e}"}, status=400)
+
+        if errors:
+            return JsonResponse(
+                {"error": "Error while processing the CSV file", "rows": errors},
+                status=400,
+            )
 
         return JsonResponse(
             {
@@ -89,9 +151,16 @@ class CSVUploadView(APIView):
         )
 
 
-class RoadSegmentViewSet(viewsets.ModelViewSet):
+class RoadSegmentViewSet(
+    ResponseCacheMixin,
+    ConditionalGetMixin,
+    NDJSONStreamMixin,
+    FastListMixin,
+    viewsets.ModelViewSet,
+):
     queryset = RoadSegment.objects.all()
     serializer_class = RoadSegmentSerializer
+    fast_serializer_class = RoadSegmentFastSerializer
     permission_classes = [IsAdminOrReadOnly]
 
     @swagger_auto_schema(
@@ -102,50 +171,277 @@ class RoadSegmentViewSet(viewsets.ModelViewSet):
                 description="Filter by traffic intensity (high, medium, low)",
                 type=openapi.TYPE_STRING,
                 enum=["high", "medium", "low"],
-            )
+            ),
+            openapi.Parameter(
+                "bbox",
+                openapi.IN_QUERY,
+                description="Segments within min_lon,min_lat,max_lon,max_lat",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "near",
+                openapi.IN_QUERY,
+                description="Segments around lon,lat (within radius meters)",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "radius",
+                openapi.IN_QUERY,
+                description="Radius in meters for near (default 500)",
+                type=openapi.TYPE_NUMBER,
+            ),
+            openapi.Parameter(
+                "stream",
+                openapi.IN_QUERY,
+                description="Stream the whole list as NDJSON",
+                type=openapi.TYPE_STRING,
+                enum=["ndjson"],
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        return self.cached(partial(self.conditional_list, request, *args, **kwargs))
+
+    def conditional_list(self, request, *args, **kwargs):
+        # Any write to the network changes every list, one version covers
+        # them. No Last-Modified, deleting a segment does not move it forward
+        render = partial(super().list, request, *args, **kwargs)
+        if "If-None-Match" in request.headers:
+            # Read first, an unchanged network answers 304 without the list
+            return self.conditional(
+                Version.objects.value(Version.SEGMENTS), None, render
+            )
+        response = render()
+        return self.conditional(self.listed_version(), None, lambda: response)
+
+    def get_list_annotations(self):
+        return {"network_version": Version.objects.subquery(Version.SEGMENTS)}
+
+    def listed_version(self):
+        # Read by the list query itself, in the snapshot of its rows
+        if self.list_rows:
+            return self.list_rows[0]["network_version"]
+        return Version.objects.value(Version.SEGMENTS)
+
+    def retrieve(self, request, *args, **kwargs):
+        segment = self.get_object()
+        return self.conditional(
+            f"{segment.pk}:{segment.modified_at.isoformat()}",
+            segment.modified_at,
+            lambda: Response(self.get_serializer(segment).data),
+        )
+
+    def response_cache_group(self, request):
+        # Spatial and streamed lists are too varied to be worth caching
+        if set(request.GET) - {"intensity", "cursor", "page_size", "format"}:
+            return None
+        intensity = request.GET.get("intensity", "").lower()
+        if intensity in INTENSITIES:
+            return intensity_group(intensity)
+        return SEGMENTS
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        intensity = self.request.query_params.get("intensity", "").lower()
+        params = self.request.query_params
+        intensity = params.get("intensity", "").lower()
 
         if intensity in ["high", "medium", "low"]:
-            queryset = [
-                segment
-                for segment in queryset
-                if segment.traffic_intensity == intensity
-            ]
+            queryset = queryset.filter_intensity(intensity)
+
+        if "bbox" in params:
+            queryset = queryset.in_bbox(*parse_bbox(params, "bbox"))
 
-            ids = [segment.id for segment in queryset]
-            queryset = RoadSegment.objects.filter(id__in=ids)
+        if "near" in params and self.action == "list":
+            point = Point(*parse_coordinates(params, "near", 2), srid=4326)
+            radius = parse_number(params, "radius", default=500, max_value=50000)
+            queryset = queryset.near(point, radius)
 
         return queryset
 
+    @swagger_auto_schema(
+        operation_description="Speed history of a segment per time bucket",
+        manual_parameters=[
+            openapi.Parameter(
+                "resolution",
+                openapi.IN_QUERY,
+                description="Bucket size, e.g. 1m, 15m, 1h, 1d (default 15m)",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "start",
+                openapi.IN_QUERY,
+                description="ISO 8601 start (default 24h ago)",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "end",
+                openapi.IN_QUERY,
+                description="ISO 8601 end (default now)",
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+    )
+    @action(detail=True, methods=["get"])
+    def history(self, request, pk=None):
+        segment = self.get_object()
+        params = request.query_params
+
+        resolution = parse_resolution(params.get("resolution", "15m"))
+        if resolution is None or resolution % 60:
+            return Response(
+                {"error": "Invalid resolution"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        end = parse_time(params, "end", timezone.now())
+        start = parse_time(params, "start", end - timedelta(hours=24))
+        if start >= end:
+            return Response(
+                {"error": "start must be before end"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if (end - start).total_seconds() / resolution > MAX_BUCKETS:
+            return Response(
+                {"error": f"More than {MAX_BUCKETS} buckets requested"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-class SpeedReadingViewSet(viewsets.ModelViewSet):
+        source, buckets = speed_history(segment.id, resolution, start, end)
+        return Response(
+            {
+                "road_segment": segment.id,
+                "resolution": params.get("resolution", "15m"),
+                "source_resolution": source,
+                "buckets": buckets,
+            }
+        )
+
+    @swagger_auto_schema(
+        operation_description="Get the k road segments nearest to a point",
+        manual_parameters=[
+            openapi.Parameter(
+                "near",
+                openapi.IN_QUERY,
+                description="Longitude and latitude",
+                type=openapi.TYPE_STRING,
+                required=True,
+                example="103.946,30.750",
+            ),
+            openapi.Parameter(
+                "k",
+                openapi.IN_QUERY,
+                description="Number of segments (max 100)",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
+    )
+    @action(detail=False, methods=["get"])
+    def nearest(self, request):
+        params = request.query_params
+        if "near" not in params:
+            return Response(
+                {"error": "near is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        point = Point(*parse_coordinates(params, "near", 2), srid=4326)
+        k = parse_integer(params, "k", default=10, max_value=100)
+        segments = RoadSegment.objects.nearest(point, k)
+        serializer = self.get_serializer(segments, many=True)
+        return Response(serializer.data)
+
+
+class RoadSegmentTileView(APIView):
+    renderer_classes = [MVTRenderer]
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get(self, request, z, x, y):
+        if z > 22 or x >= 2**z or y >= 2**z:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        etag = tile_etag(z, x, y)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(get_tile(z, x, y, etag), headers=headers)
+
+
+class SpeedReadingViewSet(NDJSONStreamMixin, viewsets.ModelViewSet):
     queryset = SpeedReading.objects.all()
     serializer_class = SpeedReadingSerializer
     permission_classes = [IsAdminOrReadOnly]
 
+    @swagger_auto_schema(
+        operation_description=(
+            "Create many readings from a JSON array, NDJSON or CSV body of "
+            "road_segment, speed and optional created_at"
+        ),
+        request_body=openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "road_segment": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "speed": openapi.Schema(type=openapi.TYPE_NUMBER),
+                    "created_at": openapi.Schema(
+                        type=openapi.TYPE_STRING, format="date-time"
+                    ),
+                },
+            ),
+        ),
+        responses={201: "Created", 400: "Bad Request"},
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        parser_classes=[JSONParser, NDJSONParser, CSVParser],
+    )
+    def bulk(self, request):
+        if not isinstance(request.data, list):
+            return Response(
+                {"error": "Expected a list of readings"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-class TrafficIntensityThresholdViewSet(viewsets.ModelViewSet):
+        created, rejected = ingest_speed_readings(request.data)
+        return Response(
+            {"created": created, "rejected": rejected},
+            status=(
+                status.HTTP_400_BAD_REQUEST
+                if rejected and not created
+                else status.HTTP_201_CREATED
+            ),
+        )
+
+
+class TrafficIntensityThresholdViewSet(
+    ResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet
+):
     queryset = TrafficIntensityThreshold.objects.all()
     serializer_class = TrafficIntensityThresholdSerializer
     http_method_names = ["get", "post", "head"]  # Disable PUT/PATCH/DELETE
 
+    def response_cache_group(self, request):
+        return THRESHOLDS
+
     def list(self, request, *args, **kwargs):
-        instance = TrafficIntensityThreshold.current()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return self.cached(self.conditional_current)
+
+    def conditional_current(self):
+        # Thresholds are never updated, the current one is identified by its
+        # pk. Read from the database, a stale copy of this process must not
+        # be stored in the shared response cache
+        instance = TrafficIntensityThreshold.objects.first()
+        instance = instance or TrafficIntensityThreshold()
+        return self.conditional(
+            f"threshold:{instance.pk}",
+            instance.created_at,
+            lambda: Response(self.get_serializer(instance).data),
+        )
 
     def get_queryset(self):
         return TrafficIntensityThreshold.objects.all().order_by("-created_at")[:1]
 
 
-class CarViewSet(viewsets.ModelViewSet):
+class CarViewSet(NDJSONStreamMixin, viewsets.ModelViewSet):
     queryset = Car.objects.all()
     serializer_class = CarSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -174,72 +470,245 @@ class CarViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        cache_key = f"car-last-24h-observations:{license_plate}"
+        result = cache.get(cache_key)
+        if result is not None:
+            return Response(result)
+
         now = timezone.now()
         start_time = now - timedelta(hours=24)
 
         try:
             car = Car.objects.get(license_plate=license_plate)
-            observations = (
-                TrafficObservation.objects.filter(car=car, timestamp__gte=start_time)
-                .select_related("sensor", "road_segment")
-                .order_by("-timestamp")
-            )
-
-            result = {
-                "car": {
-                    "license_plate": car.license_plate,
-                    "created_at": car.created_at,
-                },
-                "observations": [],
-            }
-
-            for obs in observations:
-                result["observations"].append(
-                    {
-                        "timestamp": obs.timestamp,
-                        "road_segment": {
-                            "id": obs.road_segment.id,
-                            "length": obs.road_segment.length,
-                            "current_speed": obs.road_segment.current_speed,
-                            "traffic_intensity": obs.road_segment.traffic_intensity,
-                        },
-                        "sensor": {
-                            "uuid": str(obs.sensor.uuid),
-                            "name": obs.sensor.name,
-                        },
-                    }
-                )
-
-            return Response(result)
-
         except Car.DoesNotExist:
             return Response(
                 {"error": "Car not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
+        result = car_observations_payload(car, car_observations(car, start_time))
+        cache.set(cache_key, result, settings.CAR_OBSERVATIONS_CACHE_TIMEOUT)
+        return Response(result)
 
-class SensorViewSet(viewsets.ModelViewSet):
+
+class SensorViewSet(NDJSONStreamMixin, viewsets.ModelViewSet):
     queryset = Sensor.objects.all()
     serializer_class = SensorSerializer
     permission_classes = [IsAdminOrReadOnly]
     http_method_names = ["get", "post", "delete", "head"]  # Disable PUT/PATCH
 
+    @swagger_auto_schema(
+        method="post",
+        operation_description="Issue a new API key, replacing the current one",
+        responses={201: "Created"},
+    )
+    @swagger_auto_schema(
+        method="delete",
+        operation_description="Revoke the API key",
+        responses={204: "No Content"},
+    )
+    @action(detail=True, methods=["post", "delete"], url_path="api-key")
+    def api_key(self, request, pk=None):
+        sensor = self.get_object()
+        if request.method == "DELETE":
+            sensor.revoke_api_key()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(
+            {"api_key": sensor.issue_api_key()}, status=status.HTTP_201_CREATED
+        )
+
 
-class TrafficObservationViewSet(viewsets.ModelViewSet):
-    queryset = TrafficObservation.objects.all()
+class TrafficObservationViewSet(
+    NDJSONStreamMixin, FastListMixin, viewsets.ModelViewSet
+):
+    queryset = TrafficObservation.objects.select_related("car", "sensor")
     serializer_class = TrafficObservationSerializer
+    fast_serializer_class = TrafficObservationFastSerializer
+    pagination_class = TimestampCursorPagination
     permission_classes = [SensorAPIOnlyPermission]
+    throttle_classes = [IngestLoadShedThrottle, SensorRateThrottle]
     http_method_names = ["get", "post", "head"]  # Disable PUT/PATCH/DELETE
 
     def create(self, request, *args, **kwargs):
+        # Accept and enqueue, the ingest workers store the rows
+        if request.headers.get("Prefer") == "respond-async":
+            return self.enqueue(request)
+
         if isinstance(request.data, list):  # Bulk create
-            serializer = self.get_serializer(data=request.data, many=True)
-        else:  # Single create
-            serializer = self.get_serializer(data=request.data)
+            created, rejected = ingest_observations(
+                request.data, sensor_uuid=request.sensor.uuid
+            )
+            return Response(
+                {"created": created, "rejected": rejected},
+                status=(
+                    status.HTTP_400_BAD_REQUEST
+                    if rejected and not created
+                    else status.HTTP_201_CREATED
+                ),
+            )
 
+        # Single create
+        if self.claims_other_sensor([request.data]):
+            return Response(
+                {"sensor_uuid": ["Does not match the sensor of the API key."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
         return Response(
             serializer.data, status=status.HTTP_201_CREATED, headers=headers
         )
+
+    def claims_other_sensor(self, rows):
+        # Per-sensor keys may only submit their own observations
+        sensor_uuid = self.request.sensor.uuid
+        if sensor_uuid is None:
+            return False
+        for row in rows:
+            try:
+                claimed = uuid.UUID(str(row.get("sensor_uuid")))
+            except (AttributeError, ValueError):
+                continue  # Left to row validation
+            if claimed != sensor_uuid:
+                return True
+        return False
+
+    def enqueue(self, request):
+        rows = request.data if isinstance(request.data, list) else [request.data]
+        if not all(isinstance(row, dict) for row in rows):
+            return Response(
+                {"error": "Expected an object or a list of objects"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        idempotency_key = request.headers.get("Idempotency-Key")
+        max_length = IngestBatch._meta.get_field("idempotency_key").max_length
+        if idempotency_key and len(idempotency_key) > max_length:
+            return Response(
+                {"error": f"Idempotency-Key longer than {max_length} characters"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Workers no longer know the API key, check the sensor up front
+        if self.claims_other_sensor(rows):
+            return Response(
+                {"error": "Observations of another sensor than the API key's"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            batch = enqueue(rows, idempotency_key)
+        except QueueFull:
+            return Response(
+                {"error": "Ingest queue is full"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(settings.INGEST_QUEUE_RETRY_AFTER)},
+            )
+
+        return Response(
+            {
+                "idempotency_key": batch.idempotency_key,
+                "status": batch.status,
+                "result": batch.result,
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @swagger_auto_schema(
+        operation_description="Vehicle counts per time bucket",
+        manual_parameters=[
+            openapi.Parameter(
+                "road_segment",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                "sensor_uuid",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "resolution",
+                openapi.IN_QUERY,
+                description="Bucket size, a multiple of 15m (default 1h)",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter("start", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter("end", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+        ],
+    )
+    @action(detail=False, methods=["get"])
+    def volume(self, request):
+        params = request.query_params
+        road_segment_id = sensor_id = None
+
+        if "road_segment" in params:
+            road_segment_id = parse_integer(params, "road_segment", 0, 2**63 - 1)
+        if "sensor_uuid" in params:
+            try:
+                sensor_uuid = uuid.UUID(params["sensor_uuid"])
+            except ValueError:
+                raise ValidationError({"sensor_uuid": "Must be a valid UUID."})
+            sensor = Sensor.objects.filter(uuid=sensor_uuid).first()
+            if sensor is None:
+                return Response(
+                    {"error": "Sensor not found"}, status=status.HTTP_404_NOT_FOUND
+                )
+            sensor_id = sensor.id
+        if road_segment_id is None and sensor_id is None:
+            return Response(
+                {"error": "road_segment or sensor_uuid is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        resolution = parse_resolution(params.get("resolution", "1h"))
+        if resolution is None or resolution % TrafficVolume.RESOLUTION:
+            return Response(
+                {"error": "Invalid resolution"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        end = parse_time(params, "end", timezone.now())
+        start = parse_time(params, "start", end - timedelta(hours=24))
+        if start >= end:
+            return Response(
+                {"error": "start must be before end"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if (end - start).total_seconds() / resolution > MAX_BUCKETS:
+            return Response(
+                {"error": f"More than {MAX_BUCKETS} buckets requested"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        buckets = traffic_volume(resolution, start, end, road_segment_id, sensor_id)
+        return Response({"buckets": buckets})
+
+    @swagger_auto_schema(
+        operation_description="Ingest queue metrics, or the status of a batch",
+        manual_parameters=[
+            openapi.Parameter(
+                "idempotency_key",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+            )
+        ],
+    )
+    @action(detail=False, methods=["get"])
+    def queue(self, request):
+        idempotency_key = request.query_params.get("idempotency_key")
+        if not idempotency_key:
+            return Response({**queue_metrics(), "plate_cache": plate_cache.metrics()})
+
+        batch = IngestBatch.objects.filter(idempotency_key=idempotency_key).first()
+        if not batch:
+            return Response(
+                {"error": "Batch not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(
+            {
+                "idempotency_key": batch.idempotency_key,
+                "status": batch.status,
+                "result": batch.result,
+            }
+        )
@@ -0,0 +1,82 @@
+"""
+Compare the sync (WSGI) and async (ASGI) read endpoints under concurrency.
+
+Start both servers against the same database, for example:
+
+    gunicorn core.wsgi --workers 1 --threads 8 --bind :8001
+    uvicorn core.asgi:application --workers 1 --port 8002
+
+then run:
+
+    python benchmarks/loadtest.py --wsgi http://localhost:8001 \
+        --asgi http://localhost:8002 --concurrency 500 --requests 5000
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+# (sync path, async path) of each compared endpoint
+ENDPOINTS = [
+    ("/api/roadsegment/", "/api/async/roadsegment/"),
+    ("/api/roadsegment/1/", "/api/async/roadsegment/1/"),
+    ("/api/thresholds/", "/api/async/thresholds/"),
+    (
+        "/api/cars/last_24h_observations/?license_plate=AA16AA",
+        "/api/async/cars/last_24h_observations/?license_plate=AA16AA",
+    ),
+]
+
+
+def fetch(url):
+    start = time.perf_counter()
+    try:
+        with urlopen(url, timeout=60) as response:
+            response.read()
+            ok = response.status < 500
+    except Exception:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run(url, concurrency, requests):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(fetch, [url] * requests))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--wsgi", required=True, help="Base URL of the WSGI server")
+    parser.add_argument("--asgi", required=True, help="Base URL of the ASGI server")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<58} {'mode':<5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} err")
+    for sync_path, async_path in ENDPOINTS:
+        for mode, url in [
+            ("wsgi", args.wsgi + sync_path),
+            ("asgi", args.asgi + async_path),
+        ]:
+            result = run(url, args.concurrency, args.requests)
+            print(
+                f"{sync_path:<58} {mode:<5} {result['rps']:>8.0f} "
+                f"{result['p50']:>8.1f} {result['p95']:>8.1f} {result['errors']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compare the rows per second of the road segment list serializers and renderers.
+
+Creates the segments in a transaction that is rolled back, so it can run
+against the development database:
+
+    python benchmarks/serializers.py --segments 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.gis.geos import Point  # noqa: E402
+from django.db import transaction  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from api.fast_serializers import RoadSegmentFastSerializer  # noqa: E402
+from api.models import RoadSegment  # noqa: E402
+from api.renderers import FastJSONRenderer  # noqa: E402
+from api.serializers import RoadSegmentSerializer  # noqa: E402
+
+
+def create_segments(count):
+    RoadSegment.objects.bulk_create(
+        [
+            RoadSegment(
+                start_point=Point(-8.6 + i * 1e-5, 41.1, srid=4326),
+                end_point=Point(-8.6 + i * 1e-5, 41.1001, srid=4326),
+                length=11.1,
+            )
+            for i in range(count)
+        ],
+        batch_size=5000,
+    )
+
+
+def serialize(queryset):
+    return RoadSegmentSerializer(queryset, many=True).data
+
+
+def fast_serialize(queryset):
+    fast_serializer = RoadSegmentFastSerializer()
+    return fast_serializer.serialize(fast_serializer.values(queryset))
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--segments", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'segments':>9} {'step':<30} {'rows/s':>10} {'seconds':>8}")
+    for count in args.segments:
+        with transaction.atomic():
+            create_segments(count)
+            queryset = RoadSegment.objects.order_by("-created_at", "-id")
+
+            data, serializer_time = timed(serialize, queryset)
+            fast_data, fast_time = timed(fast_serialize, queryset)
+            _, render_time = timed(JSONRenderer().render, data)
+            _, fast_render_time = timed(FastJSONRenderer().render, fast_data)
+
+            for step, seconds in [
+                ("RoadSegmentSerializer", serializer_time),
+                ("RoadSegmentFastSerializer", fast_time),
+                ("JSONRenderer", render_time),
+                ("FastJSONRenderer", fast_render_time),
+            ]:
+                print(f"{count:>9} {step:<30} {count / seconds:>10.0f} {seconds:>8.2f}")
+            transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
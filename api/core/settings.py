@@ -92,6 +92,118 @@ DATABASES = {
 }
 
 
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.CreatedAtCursorPagination",
+    "PAGE_SIZE": 100,
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Rendered list responses for anonymous clients (api.mixins.ResponseCacheMixin),
+# evicting the least recently used entries. Invalidations are stored in the
+# same cache, so it must be shared by every process writing or serving the
+# data: "file" for the workers of one host, "redis" across hosts (a local
+# server configured with maxmemory-policy allkeys-lru). Off by default.
+RESPONSE_CACHE_BACKENDS = {
+    "none": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+    "file": {
+        "BACKEND": "api.cache_backends.LRUFileBasedCache",
+        "LOCATION": os.getenv("RESPONSE_CACHE_DIR", "/tmp/traffic-responses"),
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://127.0.0.1:6379/1"),
+    },
+}
+CACHES["responses"] = {
+    **RESPONSE_CACHE_BACKENDS[os.getenv("RESPONSE_CACHE_BACKEND", "none")],
+    "TIMEOUT": 60,
+}
+
+# Recently verified sensor API keys kept per process (api.sensor_keys).
+# Revoked keys stop verifying in every process at once when the default cache
+# is shared (REDIS_URL); with the local memory cache other processes only
+# notice after SENSOR_KEY_CACHE_MAX_AGE seconds
+SENSOR_KEY_CACHE_SIZE = 10000
+SENSOR_KEY_CACHE_MAX_AGE = 30
+
+# Seconds the current threshold is kept in the shared and process-local caches
+THRESHOLD_CACHE_TIMEOUT = 300
+THRESHOLD_LOCAL_CACHE_TIMEOUT = 5
+
+# Vector tiles of the live traffic map, cached for these zoom levels. Keys
+# follow the segments in each tile, changed tiles are never served stale.
+TILE_CACHE_ZOOMS = range(0, 17)
+TILE_CACHE_TIMEOUT = 3600
+
+# Seconds a car's last 24h observations response is cached
+CAR_OBSERVATIONS_CACHE_TIMEOUT = 10
+
+
+# Time partitioning of readings and observations (manage_partitions command)
+PARTITION_INTERVAL = os.getenv("PARTITION_INTERVAL", "day")  # "day" or "week"
+PARTITION_PREMAKE = 7  # Upcoming partitions created ahead of time
+
+
+# Days each dataset is kept by the apply_retention command, None keeps it
+# forever. Raw rows are summarized into SpeedRollup and TrafficVolume as they
+# are written; 15 minute volume buckets past retention are merged into days.
+# Expired partitions of the raw tables are dropped whole.
+RETENTION_POLICY = {
+    "speed_readings": int(os.getenv("RAW_RETENTION_DAYS", 7)),
+    "traffic_observations": int(os.getenv("RAW_RETENTION_DAYS", 7)),
+    "speed_rollups": {"1m": 7, "15m": 365, "1h": 365, "1d": None},
+    "traffic_volume": 365,
+}
+RETENTION_BATCH_SIZE = 5000
+
+
+# Asynchronous ingest queue (drain_ingest_queue command)
+INGEST_QUEUE_MAX_ROWS = 1_000_000  # Pending rows before POSTs get 503
+INGEST_QUEUE_RETRY_AFTER = 5
+INGEST_WORKERS = 4
+INGEST_WORKER_MAX_ROWS = 50_000  # Rows per round, each batch commits alone
+INGEST_WORKER_MAX_BATCHES = 500
+INGEST_WORKER_MAX_ATTEMPTS = 5
+INGEST_WORKER_RETRY_BACKOFF = 5  # Seconds before a retry, doubled each time
+INGEST_WORKER_IDLE_SLEEP = 0.5
+CAR_PLATE_CACHE_SIZE = 100_000  # Plate to car id entries kept per process
+INGEST_LOOKUPS_MAX_AGE = 60  # Seconds before segment/sensor ids are reloaded
+
+# Ingest admission control (api.throttling), answered with 429 and Retry-After.
+# Observations per second and bucket size per sensor, SENSOR_THROTTLE_SHARED
+# keeps the buckets in the shared cache instead of per process.
+SENSOR_THROTTLE_RATE = int(os.getenv("SENSOR_THROTTLE_RATE", 200))
+SENSOR_THROTTLE_BURST = int(os.getenv("SENSOR_THROTTLE_BURST", 10_000))
+SENSOR_THROTTLE_SHARED = os.getenv("SENSOR_THROTTLE_SHARED") == "1"
+INGEST_SHED_QUEUE_ROWS = 800_000  # Pending rows before ingest is shed
+INGEST_SHED_DB_LATENCY = 0.5  # Seconds of the queue depth probe
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
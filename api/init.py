@@ -5,9 +5,9 @@ import django
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 django.setup()
 
-from django.contrib.gis.geos import Point
 from django.contrib.auth import get_user_model
-from api.models import RoadSegment, SpeedReading, Sensor
+from api.models import Sensor
+from api.importers import import_road_segments as import_segments_csv
 
 
 def create_admin():
@@ -26,37 +26,13 @@ def import_road_segments():
         print(f"File {csv_path} not found.")
         return
 
-    with open(csv_path, "r") as file:
-        reader = csv.reader(file)
-        next(reader)
+    with open(csv_path, "r", newline="") as file:
+        created, errors = import_segments_csv(file, strict=False)
 
-        count = 0
-        for row in reader:
-            try:
-                id, start_lon, start_lat, end_lon, end_lat, length, speed = (
-                    row[0],
-                    row[1],
-                    row[2],
-                    row[3],
-                    row[4],
-                    row[5],
-                    row[6],
-                )
-
-                road_segment = RoadSegment.objects.create(
-                    start_point=Point(float(start_lon), float(start_lat)),
-                    end_point=Point(float(end_lon), float(end_lat)),
-                    length=float(length),
-                )
-                SpeedReading.objects.create(
-                    road_segment=road_segment, speed=float(speed)
-                )
-                count += 1
-            except Exception as e:
-                print(f"Error in row {row}: {e}")
-                continue
+    for error in errors:
+        print(f"Error in line {error['line']}: {error['error']}")
 
-    print(f"{count} road segments imported")
+    print(f"{len(created)} road segments imported")
 
 
 def import_sensors():
@@ -9,8 +9,17 @@ done
 python manage.py makemigrations --noinput
 python manage.py migrate --noinput
 
+# Backfill the denormalized segment geometry and state of existing rows
+python manage.py refresh_segments
+
+# Partition time-series tables and create upcoming partitions
+python manage.py manage_partitions
+
 # Upload default data
 python init.py
 
+# Start the ingest queue workers
+python manage.py drain_ingest_queue &
+
 # Start the Django server
 python manage.py runserver 0.0.0.0:8000